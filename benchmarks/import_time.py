@@ -0,0 +1,84 @@
+"""Import-time benchmark of the package and its entry points.
+
+    python -m benchmarks.import_time --repeat 10 --top 15
+
+Every statement runs in a fresh interpreter; the median wall time is
+reported together with the slowest modules from ``python -X importtime``.
+Exits with status 1 when a statement imports one of ``--forbid`` or takes
+longer than ``--max_ms``.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Statements a photo-only job or the CLI runs before downloading
+STATEMENTS = {
+    "package": "import fast_images_loader",
+    "photo loader": "from fast_images_loader import FastImagesLoader",
+    "cli": "from fast_images_loader.loader import main",
+    "frames": "import fast_images_loader.frames",
+}
+# Heavy modules that only frame extraction and image processing may import
+HEAVY_MODULES = ("cv2", "numpy")
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(__import__("json").dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def measure(statement: str) -> Tuple[float, List[str]]:
+    """Wall time of ``statement`` in a fresh interpreter and the modules loaded afterwards"""
+    output = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement)], capture_output=True,
+                            text=True, check=True).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    return report["seconds"], report["modules"]
+
+
+def slowest_modules(statement: str, top: int) -> List[Tuple[str, int]]:
+    """The ``top`` modules with the largest self time in microseconds according to ``-X importtime``"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True,
+                            text=True, check=True).stderr
+    times: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of fast_images_loader.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per statement.")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to list.")
+    parser.add_argument("--max_ms", type=float, default=None,
+                        help="Fail when importing the package or the photo loader takes longer.")
+    parser.add_argument("--forbid", nargs="*", default=list(HEAVY_MODULES),
+                        help="Modules that must not be imported by the package, photo loader or CLI.")
+    args = parser.parse_args()
+
+    failed = False
+    for name, statement in STATEMENTS.items():
+        runs = [measure(statement) for _ in range(args.repeat)]
+        median_ms = statistics.median(seconds for seconds, _ in runs) * 1000
+        heavy = [module for module in args.forbid if module in runs[0][1]]
+        print(f"{name:<14} {median_ms:8.1f} ms  {statement}" + (f"  (imports {', '.join(heavy)})" if heavy else ""))
+        if name == "frames":
+            continue
+        if heavy or (args.max_ms is not None and name != "cli" and median_ms > args.max_ms):
+            failed = True
+    print(f"\nSlowest modules of '{STATEMENTS['photo loader']}':")
+    for module, self_us in slowest_modules(STATEMENTS["photo loader"], args.top):
+        print(f"{self_us / 1000:8.1f} ms  {module}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Throughput benchmarks against a local synthetic server.
+
+    python -m benchmarks.run --items 2000 --concurrency 16 64 256 --latency 0.02 --output before.json
+    python -m benchmarks.run --compare before.json after.json
+
+Each scenario runs in a fresh process so that its peak RSS is its own.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from fast_images_loader.pools import SPAWN, spawn_pool
+
+from .server import serve_forever, synthetic_video
+
+SCENARIOS = ("photos", "videos", "frames")
+
+
+def _peak_rss() -> int:
+    """Peak RSS of this process or of its largest child that already exited, e.g. an extraction worker"""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _quiet() -> None:
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+
+def _measure_downloads(kind: str, base_url: str, items: int, concurrency: int, workdir: str) -> dict:
+    _quiet()
+    from fast_images_loader import FastImagesLoader, RetryPolicy
+
+    media, extension = ("image", "jpg") if kind == "photos" else ("video", "avi")
+    urls = [f"{base_url}/{media}/{i}.{extension}" for i in range(items)]
+    paths = [os.path.join(workdir, f"{i}.{extension}") for i in range(items)]
+    loader = FastImagesLoader(max_in_flight=concurrency, retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.1),
+                              keep_results=True)
+    load = loader.load_photos_to_folder if kind == "photos" else loader.load_videos_to_folder
+    start = time.perf_counter()
+    results = load(urls, paths, workdir)
+    elapsed = time.perf_counter() - start
+    summary = results.summary()
+    return dict(items_per_s=items / elapsed, mb_per_s=summary["bytes"] / elapsed / 1e6, p50=summary["p50"],
+                p99=summary["p99"], ok=summary["ok"], failed=summary["failed"], seconds=elapsed,
+                peak_rss_mb=_peak_rss() / 1e6)
+
+
+def _measure_frames(video_folder: str, workdir: str, mode: str, workers: int, frame_rate: float) -> dict:
+    _quiet()
+    from fast_images_loader import FastVideosLoader
+
+    loader = FastVideosLoader(extract_mode=mode, extract_workers=workers)
+    start = time.perf_counter()
+    frames = loader.extract_frames_from_videos(video_folder, workdir, frame_rate)
+    elapsed = time.perf_counter() - start
+    # The extraction pool has shut down here, so its workers count towards the peak
+    return dict(frames_per_s=len(frames) / elapsed, frames=len(frames), seconds=elapsed,
+                peak_rss_mb=_peak_rss() / 1e6)
+
+
+def _in_fresh_process(function, *args) -> dict:
+    with spawn_pool(1) as pool:
+        return pool.submit(function, *args).result()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    # Inherited by the scenario processes
+    os.environ["TQDM_DISABLE"] = "1"
+    scratch = tempfile.mkdtemp(prefix="fil-bench-")
+    video_path = synthetic_video(os.path.join(scratch, "source.avi"), seconds=args.video_seconds)
+    parent, child = SPAWN.Pipe()
+    server = SPAWN.Process(target=serve_forever, args=(child, video_path), daemon=True,
+                             kwargs=dict(latency=args.latency, bandwidth=args.bandwidth or None,
+                                         error_rate=args.error_rate, throttle_rate=args.throttle_rate))
+    server.start()
+    base_url = f"http://127.0.0.1:{parent.recv()}"
+    report = dict(revision=_git_revision(), python=platform.python_version(), platform=platform.platform(),
+                  config=vars(args), results=[])
+    try:
+        for kind in args.scenarios:
+            if kind == "frames":
+                video_folder = os.path.join(scratch, "videos")
+                os.makedirs(video_folder, exist_ok=True)
+                for i in range(args.videos):
+                    shutil.copyfile(video_path, os.path.join(video_folder, f"video_{i}.avi"))
+                for mode in args.extract_modes:
+                    for workers in args.extract_workers:
+                        workdir = tempfile.mkdtemp(dir=scratch)
+                        row = dict(scenario=kind, mode=mode, workers=workers)
+                        row.update(_in_fresh_process(_measure_frames, video_folder, workdir, mode, workers,
+                                                     args.frame_rate))
+                        report["results"].append(row)
+                        print(json.dumps(row), file=sys.stderr)
+                continue
+            items = args.items if kind == "photos" else args.videos
+            for concurrency in args.concurrency:
+                workdir = tempfile.mkdtemp(dir=scratch)
+                row = dict(scenario=kind, concurrency=concurrency, items=items)
+                row.update(_in_fresh_process(_measure_downloads, kind, base_url, items, concurrency, workdir))
+                report["results"].append(row)
+                shutil.rmtree(workdir)
+                print(json.dumps(row), file=sys.stderr)
+    finally:
+        server.terminate()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return report
+
+
+def _key(row: dict) -> tuple:
+    return row["scenario"], row.get("concurrency"), row.get("mode"), row.get("workers")
+
+
+def compare(before_path: str, after_path: str) -> List[str]:
+    """Lines comparing the throughput of matching scenarios of two reports"""
+    with open(before_path) as f:
+        before = {_key(row): row for row in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    lines = []
+    for row in after:
+        old = before.get(_key(row))
+        metric = "frames_per_s" if row["scenario"] == "frames" else "items_per_s"
+        if old is None or not old[metric]:
+            continue
+        name = " ".join(str(part) for part in _key(row) if part is not None)
+        lines.append(f"{name}: {old[metric]:.1f} -> {row[metric]:.1f} {metric} "
+                     f"({row[metric] / old[metric] - 1:+.1%}), peak RSS {old['peak_rss_mb']:.0f} -> "
+                     f"{row['peak_rss_mb']:.0f} MB")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast_images_loader against a local synthetic server.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--items", type=int, default=2000, help="Number of photos per download scenario.")
+    parser.add_argument("--videos", type=int, default=20, help="Number of videos to download and extract.")
+    parser.add_argument("--video_seconds", type=float, default=10, help="Length of the synthetic video.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256],
+                        help="max_in_flight values to benchmark.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency per response in seconds.")
+    parser.add_argument("--bandwidth", type=float, default=0, help="Bytes per second per response, 0 for unlimited.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Share of responses that are HTTP 500.")
+    parser.add_argument("--throttle_rate", type=float, default=0.0, help="Share of responses that are HTTP 429.")
+    parser.add_argument("--extract_modes", nargs="+", default=["read", "grab", "seek"])
+    parser.add_argument("--extract_workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--frame_rate", type=float, default=1)
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two JSON reports instead of running benchmarks.")
+    args = parser.parse_args()
+
+    if args.compare:
+        print("\n".join(compare(*args.compare)))
+        return
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Local stand-in for an image/video CDN with configurable latency, bandwidth and failure rates"""
+import asyncio
+import random
+from typing import Optional
+
+import cv2
+import numpy as np
+from aiohttp import web
+
+STREAM_CHUNK = 64 * 1024
+
+
+def synthetic_image(width: int = 640, height: int = 480, seed: int = 0) -> bytes:
+    """A JPEG with gradients and noise, so its size is close to a real photo"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    image = gradient + rng.normal(0, 40, (height, width, 3)).astype(np.float32)
+    return cv2.imencode(".jpg", np.clip(image, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def synthetic_video(path: str, seconds: float = 10, fps: int = 30, width: int = 640, height: int = 360) -> str:
+    """Write a decodable MJPG video of moving gradients to ``path``"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    x = np.arange(width, dtype=np.float32)[None, :]
+    y = np.arange(height, dtype=np.float32)[:, None]
+    for index in range(int(seconds * fps)):
+        frame = ((x + y + index * 4) % 256).astype(np.uint8)
+        writer.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    writer.release()
+    return path
+
+
+def make_app(image: bytes, video: bytes, latency: float = 0.0, bandwidth: Optional[float] = None,
+             error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0) -> web.Application:
+    """Serve ``/image/<n>.jpg`` and ``/video/<n>.avi``.
+
+    Every response waits ``latency`` seconds before the headers and is sent at
+    ``bandwidth`` bytes per second when set. A share of ``error_rate``
+    requests gets a 500 and of ``throttle_rate`` a 429 with ``Retry-After: 0``.
+    """
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "throttled": 0}
+
+    async def serve(request: web.Request, body: bytes, content_type: str) -> web.StreamResponse:
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        draw = rng.random()
+        if draw < error_rate:
+            stats["errors"] += 1
+            return web.Response(status=500)
+        if draw < error_rate + throttle_rate:
+            stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        if not bandwidth:
+            return web.Response(body=body, content_type=content_type)
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for start in range(0, len(body), STREAM_CHUNK):
+            chunk = body[start:start + STREAM_CHUNK]
+            await response.write(chunk)
+            await asyncio.sleep(len(chunk) / bandwidth)
+        await response.write_eof()
+        return response
+
+    async def image_handler(request):
+        return await serve(request, image, "image/jpeg")
+
+    async def video_handler(request):
+        return await serve(request, video, "video/x-msvideo")
+
+    async def stats_handler(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/image/{name}", image_handler)
+    app.router.add_get("/video/{name}", video_handler)
+    app.router.add_get("/stats", stats_handler)
+    return app
+
+
+def serve_forever(connection, video_path: str, **options) -> None:
+    """Run the server in this process and send its port through ``connection``"""
+    async def main():
+        with open(video_path, "rb") as f:
+            video = f.read()
+        runner = web.AppRunner(make_app(synthetic_image(), video, **options), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=4096)
+        await site.start()
+        connection.send(runner.addresses[0][1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
@@ -1,3 +1,58 @@
-from .loader import FastImagesLoader, FastVideosLoader, VideoLoader
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['FastImagesLoader', 'FastVideosLoader', 'VideoLoader']
+# Public names and their modules; a module is imported on first access (PEP 562),
+# so photo-only jobs and the CLI never pay for importing OpenCV
+_EXPORTS = {
+    'FastImagesLoader': '.loader',
+    'FastVideosLoader': '.loader',
+    'VideoLoader': '.loader',
+    'HttpCache': '.cache',
+    'FrameWriter': '.encoding',
+    'HostLimiter': '.hosts',
+    'JobManifest': '.manifest',
+    'Metrics': '.metrics',
+    'PairSource': '.inputs',
+    'ImageProcessor': '.processing',
+    'InvalidImage': '.processing',
+    'DownloadResults': '.results',
+    'ItemResult': '.results',
+    'RetryPolicy': '.retry',
+    'FrameSampler': '.sampling',
+    'ShardReader': '.shards',
+    'ShardWriter': '.shards',
+    'BandwidthLimiter': '.throttle',
+    'DiskWatermark': '.throttle',
+    'FileTooLarge': '.throttle',
+    'Transport': '.transport',
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .loader import FastImagesLoader, FastVideosLoader, VideoLoader
+    from .cache import HttpCache
+    from .encoding import FrameWriter
+    from .hosts import HostLimiter
+    from .inputs import PairSource
+    from .manifest import JobManifest
+    from .metrics import Metrics
+    from .processing import ImageProcessor, InvalidImage
+    from .results import DownloadResults, ItemResult
+    from .retry import RetryPolicy
+    from .sampling import FrameSampler
+    from .shards import ShardReader, ShardWriter
+    from .throttle import BandwidthLimiter, DiskWatermark, FileTooLarge
+    from .transport import Transport
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,179 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# ioctl request number of FICLONE on Linux, used for copy-on-write reflinks
+FICLONE = 0x40049409
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Place ``src`` at ``dst`` without duplicating data when the filesystem allows it.
+
+    Tries a hardlink first, then a reflink, and falls back to a plain copy.
+    ``dst`` is replaced atomically.
+    """
+    # Unique per thread, as several writer threads may place the same blob at once
+    tmp_dst = f"{dst}.{os.getpid()}-{threading.get_ident()}.link"
+    if os.path.exists(tmp_dst):
+        os.remove(tmp_dst)
+    try:
+        try:
+            os.link(src, tmp_dst)
+        except OSError:
+            try:
+                import fcntl
+                with open(src, "rb") as fsrc, open(tmp_dst, "wb") as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except (ImportError, OSError):
+                shutil.copyfile(src, tmp_dst)
+        os.replace(tmp_dst, dst)
+    except BaseException:
+        if os.path.exists(tmp_dst):
+            os.remove(tmp_dst)
+        raise
+
+
+class HttpCache:
+    """On-disk HTTP cache with a content-addressed blob store.
+
+    For every URL the cache keeps the ETag / Last-Modified validators and the
+    SHA-256 digest of the body. Bodies are stored once per digest under
+    ``root/blobs`` and hardlinked (or reflinked) into the requested paths, so
+    the same image served under many URLs is kept on disk only once. Blobs
+    are evicted least-recently-used first when ``max_bytes`` is exceeded.
+
+    Files placed from the cache share data with the blob store when
+    hardlinked, so they should be treated as read-only.
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Blobs are placed from writer threads, so index updates are serialized
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, digest TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " digest TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (last_access)")
+        # Total blob size kept in the index, so the size cap holds across processes sharing the cache
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER)")
+        self._conn.execute("INSERT OR IGNORE INTO stats (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM blobs")
+        self._conn.commit()
+
+    def __reduce__(self):
+        # Worker processes reopen the index instead of sharing the connection
+        return type(self), (self.root, self.max_bytes)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def lookup(self, url: str) -> Tuple[Dict[str, str], Optional[str]]:
+        """Return conditional request headers and the cached digest for ``url``"""
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified, digest FROM urls WHERE url = ?",
+                                     (url,)).fetchone()
+        if row is None or not os.path.exists(self.blob_path(row[2])):
+            return {}, None
+        etag, last_modified, digest = row
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if not headers:
+            return {}, None
+        return headers, digest
+
+    def blob_size(self, digest: str) -> int:
+        return os.path.getsize(self.blob_path(digest))
+
+    def place(self, digest: str, path: str) -> None:
+        """Link the cached blob ``digest`` to ``path``; raises ``FileNotFoundError`` if evicted"""
+        link_or_copy(self.blob_path(digest), path)
+        self._touch(digest)
+
+    def store(self, url: str, tmp_path: str, path: str, digest: str, size: int,
+              etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Move a freshly downloaded ``tmp_path`` to ``path`` through the blob store.
+
+        When a blob with the same digest already exists the new copy is
+        dropped and the existing blob is linked instead.
+        """
+        blob_path = self.blob_path(digest)
+        # Files are linked or copied outside the lock, which only guards the index
+        inserted = not os.path.exists(blob_path)
+        if not inserted:
+            try:
+                link_or_copy(blob_path, path)
+            except FileNotFoundError:
+                # Evicted meanwhile
+                inserted = True
+            else:
+                os.remove(tmp_path)
+        if inserted:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            link_or_copy(tmp_path, blob_path)
+            os.replace(tmp_path, path)
+        with self._lock:
+            if inserted and self._conn.execute("INSERT OR IGNORE INTO blobs (digest, size, last_access)"
+                                               " VALUES (?, ?, ?)", (digest, size, time.time())).rowcount:
+                self._conn.execute("UPDATE stats SET total = total + ? WHERE id = 0", (size,))
+            else:
+                self._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            if etag or last_modified:
+                self._conn.execute("INSERT OR REPLACE INTO urls (url, etag, last_modified, digest)"
+                                   " VALUES (?, ?, ?, ?)", (url, etag, last_modified, digest))
+            self._conn.commit()
+            self._evict()
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM urls WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def _touch(self, digest: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            self._conn.commit()
+
+    def total_bytes(self) -> int:
+        """Size of all blobs, including those stored by other processes"""
+        return self._conn.execute("SELECT total FROM stats WHERE id = 0").fetchone()[0]
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT digest, size FROM blobs ORDER BY last_access").fetchall()
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+            # Another process may have evicted the blob meanwhile
+            if self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,)).rowcount:
+                self._conn.execute("UPDATE stats SET total = total - ? WHERE id = 0", (size,))
+                total -= size
+            self._conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
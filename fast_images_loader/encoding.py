@@ -0,0 +1,115 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .formats import FRAME_FORMATS
+from .shards import ShardWriter
+
+WriteFrame = Callable[[np.ndarray, str], None]
+
+
+class FrameWriter:
+    """Encodes and writes extracted frames.
+
+    ``image_format`` is "jpg", "png", "webp" or "npy" (raw arrays saved with
+    ``numpy.save``). ``quality`` applies to JPEG and WebP (0-100) and
+    ``compression`` to PNG (0-9); None keeps OpenCV's defaults. Frames are
+    resized to ``size`` (width, height) before encoding. With ``threads`` > 0
+    encoding and writing run in a thread pool (OpenCV releases the GIL), so
+    decoding continues meanwhile; at most ``max_pending`` frames wait for
+    the pool. With a ``sink`` (see ``ShardWriter``) frames are packed into
+    tar shards instead of one file each. Without a sink the writer only
+    holds settings, so it can be sent to worker processes.
+    """
+
+    def __init__(self, image_format: str = "jpg", quality: Optional[int] = None, compression: Optional[int] = None,
+                 size: Optional[Tuple[int, int]] = None, threads: int = 4, max_pending: Optional[int] = None,
+                 sink: Optional[ShardWriter] = None):
+        if image_format == "jpeg":
+            image_format = "jpg"
+        if image_format not in FRAME_FORMATS:
+            raise ValueError(f"Unknown frame format {image_format!r}, expected one of {FRAME_FORMATS}")
+        self.image_format = image_format
+        self.quality = quality
+        self.compression = compression
+        self.size = size
+        self.threads = threads
+        self.max_pending = max_pending or threads * 4
+        self.sink = sink
+
+    @property
+    def extension(self) -> str:
+        return "." + self.image_format
+
+    def frame_path(self, output_folder: str, number: int) -> str:
+        return os.path.join(output_folder, f"frame_{number:06d}{self.extension}")
+
+    def params(self) -> List[int]:
+        """``cv2.imwrite`` parameters for the configured format"""
+        if self.image_format == "jpg" and self.quality is not None:
+            return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        if self.image_format == "webp" and self.quality is not None:
+            return [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        if self.image_format == "png" and self.compression is not None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, self.compression]
+        return []
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        """Encoded bytes of an already resized frame"""
+        if self.image_format == "npy":
+            buffer = io.BytesIO()
+            np.save(buffer, frame)
+            return buffer.getvalue()
+        ok, encoded = cv2.imencode(self.extension, frame, self.params())
+        if not ok:
+            raise ValueError(f"Could not encode frame as {self.image_format}")
+        return encoded.tobytes()
+
+    def write(self, frame: np.ndarray, path: str) -> None:
+        """Encode and write one frame in the calling thread"""
+        if self.size is not None:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if self.sink is not None:
+            self.sink.add(self.sink.member_name(path), self.encode(frame))
+            return
+        if self.image_format == "npy":
+            np.save(path, frame)
+            return
+        params = self.params()
+        if params:
+            ok = cv2.imwrite(path, frame, params)
+        else:
+            ok = cv2.imwrite(path, frame)
+        if ok is False:
+            raise OSError(f"Could not write frame {path}")
+
+    @contextmanager
+    def open(self) -> Iterator[WriteFrame]:
+        """Yield a ``write(frame, path)`` function; all writes are finished when the block exits"""
+        if self.threads <= 0:
+            yield self.write
+            return
+        pending = threading.BoundedSemaphore(self.max_pending)
+        errors = []
+
+        def done(future):
+            pending.release()
+            if future.exception() is not None:
+                errors.append(future.exception())
+
+        def submit(frame, path):
+            if errors:
+                raise errors[0]
+            pending.acquire()
+            pool.submit(self.write, frame, path).add_done_callback(done)
+
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="fil-encode") as pool:
+            yield submit
+        if errors:
+            raise errors[0]
@@ -0,0 +1,12 @@
+"""Names shared by the OpenCV-based modules and the CLI; importing this module does not import OpenCV"""
+
+# Decode every frame and keep every n-th (the original behavior)
+READ = "read"
+# Only demux skipped frames with cap.grab() and decode the ones that are kept
+GRAB = "grab"
+# Seek to each kept frame; fastest for sparse sampling of long videos
+SEEK = "seek"
+EXTRACT_MODES = (READ, GRAB, SEEK)
+
+FRAME_FORMATS = ("jpg", "png", "webp", "npy")
+IMAGE_FORMATS = ("jpg", "png", "webp")
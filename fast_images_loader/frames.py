@@ -0,0 +1,263 @@
+import math
+import os
+import tempfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from loguru import logger
+from tqdm import tqdm
+
+from .encoding import FrameWriter
+from .formats import EXTRACT_MODES, GRAB, READ, SEEK
+from .inputs import prefetch
+from .pools import spawn_pool
+from .sampling import FrameSampler
+
+COLOR_CONVERSIONS = {"bgr": None, "rgb": cv2.COLOR_BGR2RGB, "gray": cv2.COLOR_BGR2GRAY}
+VideoSource = Union[str, os.PathLike, bytes, bytearray, memoryview]
+
+
+class FrameBatch(NamedTuple):
+    """``frames`` is a ``uint8`` array of shape (n, height, width[, channels]), ``timestamps`` holds seconds"""
+    frames: np.ndarray
+    timestamps: np.ndarray
+
+
+class FrameJob(NamedTuple):
+    """Frames ``[start_frame, end_frame)`` of one video; ``end_frame=None`` means until the end"""
+    video_path: str
+    output_folder: str
+    frame_rate: float = 1
+    mode: str = READ
+    start_frame: int = 0
+    end_frame: Optional[int] = None
+    writer: Optional[FrameWriter] = None
+    sampler: Optional[FrameSampler] = None
+
+
+def frame_interval(fps: float, frame_rate: float) -> int:
+    """Number of source frames between two extracted frames"""
+    return max(1, int(fps / frame_rate)) if fps > 0 else 1
+
+
+def _sequential_frames(cap, mode: str, interval: int, start_frame: int = 0,
+                       end_frame: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield ``(number, frame)`` of every ``interval``-th frame by reading or grabbing through the video"""
+    frame_count = start_frame
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    while end_frame is None or frame_count < end_frame:
+        keep = frame_count % interval == 0
+        if keep or mode == READ:
+            ret, frame = cap.read()
+        else:
+            ret = cap.grab()
+        if not ret:
+            break
+        if keep:
+            yield frame_count // interval, frame
+        frame_count += 1
+
+
+def _seeking_frames(cap, interval: int, fps: float, start_frame: int = 0,
+                    end_frame: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield ``(number, frame)`` of every ``interval``-th frame by seeking to each of them"""
+    number = math.ceil(start_frame / interval)
+    while end_frame is None or number * interval < end_frame:
+        cap.set(cv2.CAP_PROP_POS_MSEC, number * interval * 1000.0 / fps)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield number, frame
+        number += 1
+
+
+def _sampled_frames(cap, frame_rate: float, mode: str, start_frame: int = 0, end_frame: Optional[int] = None
+                    ) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """Yield ``(number, timestamp, frame)`` of the frames sampled at ``frame_rate`` from an opened capture"""
+    if mode not in EXTRACT_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}, expected one of {EXTRACT_MODES}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    interval = frame_interval(fps, frame_rate)
+    if mode == SEEK and fps > 0:
+        frames = _seeking_frames(cap, interval, fps, start_frame, end_frame)
+    else:
+        frames = _sequential_frames(cap, mode, interval, start_frame, end_frame)
+    for number, frame in frames:
+        yield number, number * interval / fps if fps > 0 else float(number), frame
+
+
+def extract_frames(job: FrameJob) -> List[str]:
+    """Extract the frames of ``job`` and return their paths.
+
+    Frames are named after their position in the sampled sequence, so the
+    segments of one video can be extracted independently into one folder.
+    """
+    if job.mode not in EXTRACT_MODES:
+        raise ValueError(f"Unknown extraction mode {job.mode!r}, expected one of {EXTRACT_MODES}")
+    if not os.path.exists(job.video_path):
+        logger.error(f"Video file not found: {job.video_path}")
+        return []
+
+    writer = job.writer or FrameWriter()
+    if writer.sink is None:
+        os.makedirs(job.output_folder, exist_ok=True)
+    cap = cv2.VideoCapture(job.video_path)
+
+    if not cap.isOpened():
+        logger.error(f"Could not open video: {job.video_path}")
+        return []
+
+    frame_paths = []
+    try:
+        # Encoding runs in the writer's threads while the next frames are decoded
+        with writer.open() as write:
+            frames = _sampled_frames(cap, job.frame_rate, job.mode, job.start_frame, job.end_frame)
+            if job.sampler is not None:
+                frames = job.sampler.select(frames)
+            for number, _, frame in frames:
+                frame_path = writer.frame_path(job.output_folder, number)
+                write(frame, frame_path)
+                frame_paths.append(frame_path)
+    finally:
+        cap.release()
+    logger.info(f"Extracted {len(frame_paths)} frames from {job.video_path}")
+    return frame_paths
+
+
+@contextmanager
+def _video_file(source: VideoSource) -> Iterator[str]:
+    """Path of a video given as a path or as an in-memory buffer written to a temporary file"""
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    # OpenCV can only open files; /dev/shm keeps the temporary copy in memory where available
+    temp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.NamedTemporaryFile(dir=temp_dir, prefix="fil-", suffix=".video", delete=False) as f:
+        f.write(source)
+    try:
+        yield f.name
+    finally:
+        os.remove(f.name)
+
+
+def iter_frames(source: VideoSource, frame_rate: float = 1, mode: str = READ,
+                size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                sampler: Optional[FrameSampler] = None) -> Iterator[Tuple[float, np.ndarray]]:
+    """Yield ``(timestamp, frame)`` for the frames sampled at ``frame_rate`` without writing them to disk.
+
+    ``source`` is a path or the bytes of a video, e.g. a downloaded response
+    body. Frames are ``uint8`` arrays, resized to ``size`` (width, height)
+    and converted to ``color`` ("bgr", "rgb" or "gray") on the fly, after
+    the optional ``sampler`` has selected them.
+    """
+    if color not in COLOR_CONVERSIONS:
+        raise ValueError(f"Unknown color {color!r}, expected one of {tuple(COLOR_CONVERSIONS)}")
+    conversion = COLOR_CONVERSIONS[color]
+    with _video_file(source) as video_path:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {source if isinstance(source, str) else 'buffer'}")
+        try:
+            frames = _sampled_frames(cap, frame_rate, mode)
+            if sampler is not None:
+                frames = sampler.select(frames)
+            for _, timestamp, frame in frames:
+                if size is not None:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                if conversion is not None:
+                    frame = cv2.cvtColor(frame, conversion)
+                yield timestamp, frame
+        finally:
+            cap.release()
+
+
+def iter_frame_batches(source: VideoSource, batch_size: int = 32, frame_rate: float = 1, mode: str = READ,
+                       size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                       sampler: Optional[FrameSampler] = None) -> Iterator[FrameBatch]:
+    """Like iter_frames, but yield stacked batches of ``batch_size`` frames (the last one may be smaller)"""
+    frames = timestamps = None
+    count = 0
+    for timestamp, frame in iter_frames(source, frame_rate, mode, size, color, sampler):
+        if frames is None:
+            frames = np.empty((batch_size,) + frame.shape, np.uint8)
+            timestamps = np.empty(batch_size, np.float64)
+        frames[count] = frame
+        timestamps[count] = timestamp
+        count += 1
+        if count == batch_size:
+            yield FrameBatch(frames, timestamps)
+            frames = timestamps = None
+            count = 0
+    if count:
+        yield FrameBatch(frames[:count], timestamps[:count])
+
+
+async def aiter_frames(source: VideoSource, frame_rate: float = 1, mode: str = READ,
+                       size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                       sampler: Optional[FrameSampler] = None,
+                       read_ahead: int = 8) -> AsyncIterator[Tuple[float, np.ndarray]]:
+    """Async version of iter_frames; decoding runs in a worker thread ``read_ahead`` frames ahead"""
+    async for item in prefetch(iter_frames(source, frame_rate, mode, size, color, sampler), read_ahead):
+        yield item
+
+
+async def aiter_frame_batches(source: VideoSource, batch_size: int = 32, frame_rate: float = 1, mode: str = READ,
+                              size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                              sampler: Optional[FrameSampler] = None) -> AsyncIterator[FrameBatch]:
+    """Async version of iter_frame_batches; the next batch is decoded in a worker thread meanwhile"""
+    async for batch in prefetch(iter_frame_batches(source, batch_size, frame_rate, mode, size, color, sampler), 1):
+        yield batch
+
+
+def plan_jobs(video_path: str, output_folder: str, frame_rate: float = 1, mode: str = READ,
+              segment_seconds: Optional[float] = None, writer: Optional[FrameWriter] = None,
+              sampler: Optional[FrameSampler] = None) -> List[FrameJob]:
+    """Split a video into jobs of about ``segment_seconds`` each, or one job for the whole video"""
+    if not segment_seconds:
+        return [FrameJob(video_path, output_folder, frame_rate, mode, writer=writer, sampler=sampler)]
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    if fps <= 0 or frame_count <= 0:
+        return [FrameJob(video_path, output_folder, frame_rate, mode, writer=writer, sampler=sampler)]
+    interval = frame_interval(fps, frame_rate)
+    # Segment borders are aligned to kept frames so no frame is extracted twice
+    segment_frames = max(interval, int(segment_seconds * fps) // interval * interval)
+    starts = list(range(0, frame_count, segment_frames))
+    # The last segment is open-ended because CAP_PROP_FRAME_COUNT is only an estimate
+    return [FrameJob(video_path, output_folder, frame_rate, mode, start, starts[i + 1] if i + 1 < len(starts) else None,
+                     writer, sampler)
+            for i, start in enumerate(starts)]
+
+
+def extraction_executor(workers: int, processes: bool = True) -> Executor:
+    """Process pool for ``workers`` > 1; threads when ``processes`` is False or for a single worker.
+
+    Threads are needed when the jobs share an in-process object such as a
+    shard sink; OpenCV releases the GIL while decoding and encoding.
+    """
+    if workers <= 1 or not processes:
+        return ThreadPoolExecutor(max(1, workers), thread_name_prefix="fil-frames")
+    return spawn_pool(workers)
+
+
+def uses_sink(jobs: List[FrameJob]) -> bool:
+    return any(job.writer is not None and job.writer.sink is not None for job in jobs)
+
+
+def extract_frames_parallel(jobs: List[FrameJob], workers: Optional[int] = None) -> List[str]:
+    """Run frame extraction jobs in a process pool and return all frame paths in job order"""
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        results = [extract_frames(job) for job in tqdm(jobs, desc="Extracting frames")]
+    else:
+        with extraction_executor(workers, processes=not uses_sink(jobs)) as pool:
+            results = list(tqdm(pool.map(extract_frames, jobs), total=len(jobs), desc="Extracting frames"))
+    return [path for paths in results for path in paths]
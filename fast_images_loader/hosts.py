@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+
+SUCCESS = "success"
+THROTTLED = "throttled"
+ERROR = "error"
+# Outcomes that say nothing about host health, e.g. 404
+NEUTRAL = "neutral"
+
+
+class _HostState:
+    __slots__ = ("limit", "tokens", "refilled_at", "decreased_at", "requests", "successes", "throttled",
+                 "errors", "decreases")
+
+    def __init__(self, limit: float, tokens: float):
+        self.limit = limit
+        self.tokens = tokens
+        self.refilled_at = time.monotonic()
+        self.decreased_at = 0.0
+        self.requests = 0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.decreases = 0
+
+
+class HostLimiter:
+    """Per-host token buckets and AIMD concurrency limits.
+
+    Every host starts at ``initial_limit`` concurrent requests. Each success
+    grows the limit additively (by about one per limit's worth of successes)
+    up to ``max_limit``; a 429/503, 5xx or timeout multiplies it by
+    ``decrease_factor`` down to ``min_limit``. Only requests started after the
+    last decrease can shrink the limit again, so one burst of failures counts
+    once. When ``rate`` is set, requests to each host are additionally spaced
+    by a token bucket of ``rate`` requests per second with ``burst`` capacity.
+    With ``adaptive=False`` only the rate is limited.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 64,
+                 decrease_factor: float = 0.5, adaptive: bool = True,
+                 rate: Optional[float] = None, burst: Optional[float] = None):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= initial_limit <= max_limit")
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.adaptive = adaptive
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(float(self.initial_limit), self.burst)
+        return state
+
+    def limit(self, host: str) -> Optional[int]:
+        """Current number of concurrent requests allowed for ``host``, None if not limited"""
+        return int(self._state(host).limit) if self.adaptive else None
+
+    def try_acquire(self, host: str) -> float:
+        """Take a token of the host's bucket; returns 0 on success, else the seconds until a token is available"""
+        if self.rate is None:
+            return 0.0
+        state = self._state(host)
+        now = time.monotonic()
+        state.tokens = min(self.burst, state.tokens + (now - state.refilled_at) * self.rate)
+        state.refilled_at = now
+        if state.tokens >= 1:
+            state.tokens -= 1
+            return 0.0
+        return (1 - state.tokens) / self.rate
+
+    async def acquire(self, host: str) -> None:
+        """Wait for a token of the host's bucket when a rate is configured"""
+        while True:
+            delay = self.try_acquire(host)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    def record(self, host: str, outcome: str, started: float) -> None:
+        """Feed the outcome of a request started at ``started`` (``time.monotonic()``) into the limit"""
+        state = self._state(host)
+        state.requests += 1
+        if outcome == SUCCESS:
+            state.successes += 1
+            if self.adaptive:
+                state.limit = min(float(self.max_limit), state.limit + 1.0 / state.limit)
+        elif outcome in (THROTTLED, ERROR):
+            if outcome == THROTTLED:
+                state.throttled += 1
+            else:
+                state.errors += 1
+            if self.adaptive and started >= state.decreased_at:
+                state.limit = max(float(self.min_limit), state.limit * self.decrease_factor)
+                state.decreased_at = time.monotonic()
+                state.decreases += 1
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            host: dict(limit=int(state.limit), requests=state.requests, successes=state.successes,
+                       throttled=state.throttled, errors=state.errors, decreases=state.decreases)
+            for host, state in self._hosts.items()
+        }
+
+    def log_stats(self, top: int = 10) -> None:
+        hosts = sorted(self._hosts.items(), key=lambda item: item[1].requests, reverse=True)[:top]
+        for host, state in hosts:
+            logger.info(f"{host}: limit {int(state.limit)}, {state.requests} requests, {state.successes} ok, "
+                        f"{state.throttled} throttled, {state.errors} errors")
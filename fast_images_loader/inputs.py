@@ -0,0 +1,124 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+from itertools import chain, islice
+from typing import AsyncIterator, Iterable, Iterator, Optional, Tuple
+
+INPUT_FORMATS = ("txt", "csv", "jsonl", "parquet")
+DEFAULT_EXTENSIONS = {"photo": ".jpg", "video": ".mp4"}
+
+
+def detect_format(source: str) -> str:
+    """Guess the input format from the file extension; stdin and unknown extensions are plain text"""
+    name = source.lower()
+    for suffix, input_format in ((".csv", "csv"), (".jsonl", "jsonl"), (".ndjson", "jsonl"),
+                                 (".parquet", "parquet"), (".pq", "parquet")):
+        if name.endswith(suffix):
+            return input_format
+    return "txt"
+
+
+class PairSource:
+    """Lazily reads ``(url, path)`` pairs from a file or stdin (``"-"``).
+
+    Supported formats are plain text (one URL per line, optionally followed by
+    a tab and a path), CSV and JSONL with ``url`` and optional ``path``
+    columns, and Parquet when ``pyarrow`` is installed. Missing paths are
+    generated as ``<media>_<n><ext>`` and relative paths are placed in
+    ``data_folder``. Rows are read one at a time, so memory does not grow with
+    the size of the input. The source can be iterated several times (except
+    stdin) and pickled, which lets worker processes read their own share.
+    """
+
+    def __init__(self, source: str, data_folder: str, input_format: str = "auto", media: str = "photo",
+                 extension: Optional[str] = None):
+        if input_format == "auto":
+            input_format = detect_format(source)
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"Unknown input format {input_format!r}, expected one of {INPUT_FORMATS}")
+        self.source = source
+        self.data_folder = data_folder
+        self.input_format = input_format
+        self.media = media
+        self.extension = extension or DEFAULT_EXTENSIONS.get(media, "")
+        # Rows of stdin already read by first_url(), replayed by the next iteration
+        self._peeked = None
+
+    def __getstate__(self):
+        return dict(self.__dict__, _peeked=None)
+
+    def first_url(self) -> Optional[str]:
+        """URL of the first row, e.g. to pick the media type before any path is generated"""
+        rows = self._rows()
+        first = next(rows, None)
+        if self.source == "-":
+            # stdin can only be read once
+            self._peeked = chain([first], rows) if first is not None else iter(())
+        else:
+            rows.close()
+        return first[0] if first is not None else None
+
+    def _open_text(self):
+        if self.source == "-":
+            return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        return open(self.source, encoding="utf-8", newline="")
+
+    def _rows(self) -> Iterator[Tuple[str, Optional[str]]]:
+        if self.input_format == "parquet":
+            yield from self._parquet_rows()
+            return
+        with self._open_text() as f:
+            if self.input_format == "txt":
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        url, _, path = line.partition("\t")
+                        yield url.strip(), path.strip() or None
+            elif self.input_format == "csv":
+                for row in csv.DictReader(f):
+                    yield row["url"], row.get("path") or None
+            else:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        yield row["url"], row.get("path") or None
+
+    def _parquet_rows(self) -> Iterator[Tuple[str, Optional[str]]]:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet input requires pyarrow: pip install pyarrow")
+        parquet_file = pq.ParquetFile(self.source)
+        columns = [name for name in ("url", "path") if name in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(columns=columns):
+            batch = batch.to_pydict()
+            paths = batch.get("path") or [None] * len(batch["url"])
+            yield from zip(batch["url"], paths)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        rows, self._peeked = self._peeked or self._rows(), None
+        for number, (url, path) in enumerate(rows):
+            if not path:
+                path = f"{self.media}_{number}{self.extension}"
+            yield url, os.path.join(self.data_folder, path)
+
+
+async def prefetch(pairs: Iterable, chunk_size: int = 1024) -> AsyncIterator:
+    """Iterate a blocking iterable from a worker thread with at most two chunks read ahead"""
+    loop = asyncio.get_running_loop()
+    iterator = iter(pairs)
+
+    def read_chunk():
+        return list(islice(iterator, chunk_size))
+
+    next_chunk = loop.run_in_executor(None, read_chunk)
+    while True:
+        chunk = await next_chunk
+        if not chunk:
+            return
+        next_chunk = loop.run_in_executor(None, read_chunk)
+        for item in chunk:
+            yield item
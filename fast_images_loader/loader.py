@@ -2,209 +2,905 @@ import asyncio
 import os
 import aiohttp
 import aiofiles
-import cv2
-from tqdm.asyncio import tqdm
+import aiofiles.os
 from loguru import logger
 import argparse
-from typing import List, Union, Optional
+import hashlib
+import time
+from time import perf_counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from typing import (TYPE_CHECKING, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Union,
+                    Optional, Sequence, Tuple)
 from pathlib import Path
+from urllib.parse import urlsplit
 
-try:
-    get_ipython
+from .cache import HttpCache
+from .formats import EXTRACT_MODES, FRAME_FORMATS, IMAGE_FORMATS, READ
+from .hosts import ERROR, NEUTRAL, SUCCESS, THROTTLED, HostLimiter
+from .inputs import DEFAULT_EXTENSIONS, INPUT_FORMATS, PairSource, prefetch
+from .manifest import PARTIAL, JobManifest
+from .metrics import EXTRACT_DONE, EXTRACT_QUEUED, ITEM_DONE, REQUEST_END, REQUEST_START, Metrics
+from .results import FAILED, NOT_MODIFIED, OK, SKIPPED, DownloadResults, ItemResult, RequestTimings
+from .retry import RetryPolicy
+from .scheduler import SlidingWindowScheduler, as_async_iterator, url_host
+from .shards import ShardWriter
+from .throttle import BandwidthLimiter, DiskWatermark, FileTooLarge
+from .transport import Transport
+
+if TYPE_CHECKING:
+    # OpenCV and NumPy are only imported once frames or images are processed
+    import numpy as np
+    from .encoding import FrameWriter
+    from .frames import FrameBatch, VideoSource
+    from .processing import ImageProcessor
+    from .sampling import FrameSampler
+
+_nest_asyncio_applied = False
+
+
+def _apply_nest_asyncio() -> None:
+    """Allow nested event loops inside IPython, checked on first use instead of at import"""
+    global _nest_asyncio_applied
+    if _nest_asyncio_applied:
+        return
+    _nest_asyncio_applied = True
+    try:
+        get_ipython
+    except NameError:
+        return
     import nest_asyncio
     nest_asyncio.apply()
-except NameError:
-    pass
 
-class PhotoLoader:
-    def __init__(self):
+class MediaLoader:
+    media = "file"
+    # Whether an interrupted download keeps its .part file and resumes with HTTP Range
+    resumable = False
+    # Largest body a sink takes from memory; larger or unsized bodies stream through <path>.part
+    sink_in_memory_limit = 8 * 1024 * 1024
+    # Items written to a sink are marked done in the manifest in batches, once the sink is synced
+    sink_sync_every = 100
+
+    def __init__(self, timeout: Optional[aiohttp.ClientTimeout] = None, chunk_size: int = 64 * 1024,
+                 executor: Optional[Executor] = None, manifest: Optional[JobManifest] = None,
+                 cache: Optional[HttpCache] = None, retry: Optional[RetryPolicy] = None,
+                 hosts: Optional[HostLimiter] = None, sink: Optional[ShardWriter] = None,
+                 processor: Optional["ImageProcessor"] = None, processor_executor: Optional[Executor] = None,
+                 metrics: Optional[Metrics] = None, bandwidth: Sequence[BandwidthLimiter] = (),
+                 max_file_size: Optional[int] = None, disk: Optional[DiskWatermark] = None,
+                 admitted: bool = False):
         self.counter = 0
+        # None means the session timeout (see Transport) is used
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        # Thread pool used for file writes; None means the loop's default executor
+        self.executor = executor
+        self.manifest = manifest
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.hosts = hosts
+        # Shard archive receiving the files instead of one file per path
+        self.sink = sink
+        # Validation/resizing of bodies before they are stored, run in processor_executor
+        self.processor = processor
+        self.processor_executor = processor_executor
+        self.metrics = metrics
+        # Every chunk waits for all limiters, e.g. one per job and one shared by all jobs
+        self.bandwidth = bandwidth
+        self.max_file_size = max_file_size
+        self.disk = disk
+        self._unsynced: List[tuple] = []
+        # The scheduler already admitted the first attempt past the host's circuit breaker and token bucket,
+        # only retries wait for them here
+        self.admitted = admitted
 
-    async def request(self, session, photo_url, photo_path):
-        retry_count = 2
-        while retry_count >= 0:
-            try:
-                async with session.get(photo_url, timeout=5) as res:
-                    if res.status == 200:
-                        with open(photo_path, "wb") as f:
-                            f.write(await res.read())
-                        return 1
-                    return b""
-            except Exception as e:
-                logger.warning(f"Failed to download image from {photo_url}: {e}")
-                retry_count -= 1
-        return b""
+    def _request_kwargs(self) -> dict:
+        return {"timeout": self.timeout} if self.timeout is not None else {}
 
+    def _resume_headers(self, url: str, path: str) -> dict:
+        if not self.resumable or self.manifest is None:
+            return {}
+        entry = self.manifest.get(url, path)
+        if entry is None or entry.status != PARTIAL:
+            return {}
+        validator = entry.etag or entry.last_modified
+        tmp_path = f"{path}.part"
+        # Without a validator we cannot be sure the remote file did not change
+        if not validator or not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+            return {}
+        return {"Range": f"bytes={os.path.getsize(tmp_path)}-", "If-Range": validator}
 
-class VideoLoader:
-    def __init__(self):
-        self.counter = 0
+    async def _hash_file(self, path: str, hasher) -> None:
+        def update():
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+        await asyncio.get_running_loop().run_in_executor(self.executor, update)
 
-    async def request(self, session, video_url, video_path):
-        retry_count = 2
-        while retry_count >= 0:
-            try:
-                async with session.get(video_url, timeout=30) as res:  # Longer timeout for videos
-                    if res.status == 200:
-                        async with aiofiles.open(video_path, "wb") as f:
-                            async for chunk in res.content.iter_chunked(8192):
-                                await f.write(chunk)
-                        return 1
-                    return 0
-            except Exception as e:
-                logger.warning(f"Failed to download video from {video_url}: {e}")
-                retry_count -= 1
-        return 0
-
-    def extract_frames(self, video_path: str, output_folder: str, frame_rate: int = 1) -> List[str]:
-        """Extract frames from video at specified frame rate"""
-        if not os.path.exists(video_path):
-            logger.error(f"Video file not found: {video_path}")
-            return []
-
-        os.makedirs(output_folder, exist_ok=True)
-        cap = cv2.VideoCapture(video_path)
-        
-        if not cap.isOpened():
-            logger.error(f"Could not open video: {video_path}")
-            return []
+    async def _stream_to_file(self, res, path: str, append: bool = False):
+        """Stream the response body to ``<path>.part`` without blocking the event loop.
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps / frame_rate) if fps > 0 else 1
-        
-        frame_paths = []
-        frame_count = 0
-        saved_frame_count = 0
+        The caller moves the file to its final path once the body is complete
+        (see ``_finalize``), so partial files never appear at ``path``.
+        Returns the size and, when a manifest or cache is used, the SHA-256 checksum.
+        """
+        tmp_path = f"{path}.part"
+        hasher = hashlib.sha256() if self.manifest is not None or self.cache is not None else None
+        size = 0
+        if append:
+            size = os.path.getsize(tmp_path)
+            if hasher is not None:
+                await self._hash_file(tmp_path, hasher)
+        try:
+            async with aiofiles.open(tmp_path, "ab" if append else "wb", executor=self.executor) as f:
+                async for chunk in self._iter_body(res, size):
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    size += len(chunk)
+                    await f.write(chunk)
+        except BaseException as e:
+            # Oversized files would hit the limit again when resumed
+            keep_partial = self.resumable and self.manifest is not None and not isinstance(e, FileTooLarge)
+            if not keep_partial and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return size, hasher.hexdigest() if hasher is not None else None
+
+    async def _iter_body(self, res, offset: int = 0) -> AsyncIterator[bytes]:
+        """Body chunks paced by the bandwidth limiters; raises ``FileTooLarge`` past ``max_file_size``.
+
+        ``offset`` is the size already on disk when a download is resumed.
+        """
+        size = offset
+        if self.max_file_size is not None and res.content_length is not None \
+                and offset + res.content_length > self.max_file_size:
+            raise FileTooLarge(f"Content-Length {offset + res.content_length} exceeds {self.max_file_size} bytes")
+        async for chunk in res.content.iter_chunked(self.chunk_size):
+            size += len(chunk)
+            if self.max_file_size is not None and size > self.max_file_size:
+                raise FileTooLarge(f"Body exceeds {self.max_file_size} bytes")
+            for limiter in self.bandwidth:
+                await limiter.consume(len(chunk))
+            if self.metrics is not None:
+                self.metrics.add_bytes(len(chunk))
+            yield chunk
+
+    async def _read_body(self, res) -> bytearray:
+        body = bytearray()
+        async for chunk in self._iter_body(res):
+            body += chunk
+        return body
+
+    async def _load_in_memory(self, url: str, path: str, res) -> int:
+        """Read the body, run the processor on it and store the result without a temporary file where possible.
 
+        Rejected bodies raise before anything is written.
+        """
+        body = await self._read_body(res)
+        loop = asyncio.get_running_loop()
+        if self.processor is not None:
+            body = await loop.run_in_executor(self.processor_executor, self.processor.process, bytes(body),
+                                              res.headers.get("Content-Type"))
+        checksum = hashlib.sha256(body).hexdigest() if self.manifest is not None or self.cache is not None else None
+        if self._uses_part_file(res):
+            async with aiofiles.open(f"{path}.part", "wb", executor=self.executor) as f:
+                await f.write(body)
+            await self._finalize(url, path, res, len(body), checksum)
+            return len(body)
+        await loop.run_in_executor(self.executor, self.sink.add, self.sink.member_name(path), body)
+        await self._mark_done(url, path, len(body), res.headers.get("ETag"), res.headers.get("Last-Modified"),
+                              checksum)
+        return len(body)
+
+    def _uses_part_file(self, res) -> bool:
+        """Files go through ``<path>.part`` unless a sink takes a small body of known size directly"""
+        if self.sink is None or self.cache is not None or (self.resumable and self.manifest is not None):
+            return True
+        return res.content_length is None or res.content_length > self.sink_in_memory_limit
+
+    async def _finalize(self, url: str, path: str, res, size: int, checksum: Optional[str]) -> None:
+        """Move a completed ``<path>.part`` to ``path``, through the cache when one is used"""
+        tmp_path = f"{path}.part"
+        loop = asyncio.get_running_loop()
+        if self.cache is not None:
+            await loop.run_in_executor(self.executor, self.cache.store, url, tmp_path, path, checksum, size,
+                                       res.headers.get("ETag"), res.headers.get("Last-Modified"))
+            if self.sink is not None:
+                await loop.run_in_executor(self.executor, self.sink.add_file, self.sink.member_name(path), path, True)
+        elif self.sink is not None:
+            await loop.run_in_executor(self.executor, self.sink.add_file, self.sink.member_name(path), tmp_path, True)
+        else:
+            await aiofiles.os.replace(tmp_path, path, executor=self.executor)
+        await self._mark_done(url, path, size, res.headers.get("ETag"), res.headers.get("Last-Modified"), checksum)
+
+    async def _place_cached(self, url: str, path: str, digest: str) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.cache.place, digest, path)
+        if self.sink is not None:
+            await loop.run_in_executor(self.executor, self.sink.add_file, self.sink.member_name(path), path, True)
+        await self._mark_done(url, path, self.cache.blob_size(digest), checksum=digest)
+
+    async def _mark_done(self, url: str, path: str, size: int, etag: Optional[str] = None,
+                         last_modified: Optional[str] = None, checksum: Optional[str] = None) -> None:
+        """Mark an item done; items in the sink wait until their shard data is on disk (see ``sync_sink``)"""
+        if self.manifest is None:
+            return
+        if self.sink is None:
+            self.manifest.mark_done(url, path, size, etag, last_modified, checksum)
+            return
+        self._unsynced.append((url, path, size, etag, last_modified, checksum))
+        if len(self._unsynced) >= self.sink_sync_every:
+            await self.sync_sink()
+
+    async def sync_sink(self) -> None:
+        """Sync the sink and mark the items written to it done, so a crash never skips unwritten items"""
+        if not self._unsynced:
+            return
+        entries, self._unsynced = self._unsynced, []
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.sink.sync)
+        for entry in entries:
+            self.manifest.mark_done(*entry)
+
+    def _record_started(self, url: str, path: str, res, offset: int) -> None:
+        """Record the validators before the body streams, so that even a killed or cancelled download resumes"""
+        if not self.resumable or self.manifest is None:
+            return
+        self.manifest.mark_partial(url, path, offset, res.headers.get("ETag"), res.headers.get("Last-Modified"),
+                                   count_attempt=False)
+        self.manifest.flush()
+
+    def _record_partial(self, url: str, path: str, res, error: Exception) -> None:
+        tmp_path = f"{path}.part"
+        if self.manifest is None or res is None or not os.path.exists(tmp_path):
+            return
+        self.manifest.mark_partial(url, path, os.path.getsize(tmp_path), res.headers.get("ETag"),
+                                   res.headers.get("Last-Modified"), error=repr(error))
+
+    async def request(self, session, url, path) -> ItemResult:
+        attempts = 0
+        error = None
+        http_status = 0
+        host = url_host(url)
+        timings = RequestTimings()
+        item_start = attempt_start = perf_counter()
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            res = None
+            retry_after = None
+            transient = True
+            attempts += 1
+            if self.disk is not None:
+                await self.disk.wait(path)
+            if not (self.admitted and attempts == 1):
+                await self.retry.wait_for_host(host)
+                if self.hosts is not None:
+                    await self.hosts.acquire(host)
+            timings.reset()
+            attempt_start = perf_counter()
+            started = time.monotonic()
+            if self.metrics is not None:
+                self.metrics.emit(REQUEST_START, url=url, host=host, attempt=attempts)
+            try:
+                headers = self._resume_headers(url, path)
+                cached_digest = None
+                if self.cache is not None and not headers:
+                    # The index lookup waits for writer threads holding the cache lock, so it runs off the loop
+                    headers, cached_digest = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, self.cache.lookup, url)
+                async with session.get(url, headers=headers, trace_request_ctx=timings,
+                                       **self._request_kwargs()) as res:
+                    ttfb = perf_counter() - attempt_start
+                    http_status = res.status
+                    if res.status == 304 and cached_digest is not None:
+                        try:
+                            await self._place_cached(url, path, cached_digest)
+                        except FileNotFoundError:
+                            # The blob was evicted meanwhile, download the body again right away
+                            self.cache.forget(url)
+                            self._end_attempt(url, host, attempts, res.status, NEUTRAL, "FileNotFoundError", started)
+                            if attempts < self.retry.max_attempts:
+                                continue
+                            error = "FileNotFoundError"
+                            break
+                        self._end_attempt(url, host, attempts, res.status, SUCCESS, None, started)
+                        return self._result(NOT_MODIFIED, res.status, 0, attempts, None, timings,
+                                            item_start, attempt_start, ttfb)
+                    if res.status == 416 and "Range" in headers:
+                        # Our partial file does not match the remote one anymore, start over right away
+                        os.remove(f"{path}.part")
+                        self.manifest.mark_failed(url, path, "HTTP 416")
+                        self._end_attempt(url, host, attempts, res.status, NEUTRAL, "HTTPError", started)
+                        if attempts < self.retry.max_attempts:
+                            continue
+                        error = "HTTPError"
+                        break
+                    if res.status == 200 and (self.processor is not None or not self._uses_part_file(res)):
+                        size = await self._load_in_memory(url, path, res)
+                        self._end_attempt(url, host, attempts, res.status, SUCCESS, None, started)
+                        return self._result(OK, res.status, size, attempts, None, timings,
+                                            item_start, attempt_start, ttfb)
+                    if res.status == 200 or (res.status == 206 and "Range" in headers):
+                        self._record_started(url, path, res,
+                                             os.path.getsize(f"{path}.part") if res.status == 206 else 0)
+                        size, checksum = await self._stream_to_file(res, path, append=res.status == 206)
+                        await self._finalize(url, path, res, size, checksum)
+                        self._end_attempt(url, host, attempts, res.status, SUCCESS, None, started)
+                        return self._result(OK, res.status, size, attempts, None, timings,
+                                            item_start, attempt_start, ttfb)
+                    error = "HTTPError"
+                    transient = self.retry.is_transient_status(res.status)
+                    retry_after = res.headers.get("Retry-After")
+                    if res.status in (429, 503):
+                        outcome = THROTTLED
+                    else:
+                        outcome = ERROR if transient else NEUTRAL
+                    logger.warning(f"Failed to download {self.media} from {url}: HTTP {res.status}")
+            except Exception as e:
+                logger.warning(f"Failed to download {self.media} from {url}: {e}")
+                self._record_partial(url, path, res, e)
+                error = type(e).__name__
+                transient = self.retry.is_transient_error(e)
+                outcome = ERROR if transient else NEUTRAL
+            self._end_attempt(url, host, attempts, http_status, outcome, error, started)
+            if not transient or not self.retry.can_retry(attempts):
                 break
-                
-            if frame_count % frame_interval == 0:
-                frame_filename = f"frame_{saved_frame_count:06d}.jpg"
-                frame_path = os.path.join(output_folder, frame_filename)
-                cv2.imwrite(frame_path, frame)
-                frame_paths.append(frame_path)
-                saved_frame_count += 1
-                
-            frame_count += 1
+            await asyncio.sleep(self.retry.delay(attempts, retry_after))
+        if self.manifest is not None:
+            entry = self.manifest.get(url, path)
+            # Keep partial entries so that the next run can resume them
+            if entry is None or entry.status != PARTIAL or not os.path.exists(f"{path}.part"):
+                self.manifest.mark_failed(url, path, f"HTTP {http_status}" if error == "HTTPError" else error)
+        return self._result(FAILED, http_status, 0, attempts, error, timings, item_start, attempt_start, 0.0)
+
+    def _end_attempt(self, url: str, host: str, attempt: int, http_status: int, outcome: str,
+                     error: Optional[str], started: float) -> None:
+        self._record_host(host, outcome, started)
+        if self.metrics is not None:
+            self.metrics.emit(REQUEST_END, url=url, host=host, attempt=attempt, http_status=http_status,
+                              outcome=outcome, error=error, seconds=time.monotonic() - started)
+
+    def _record_host(self, host: str, outcome: str, started: float) -> None:
+        if outcome == SUCCESS:
+            self.retry.record_success(host)
+        elif outcome == NEUTRAL:
+            self.retry.record_neutral(host)
+        else:
+            self.retry.record_failure(host)
+        if self.hosts is not None:
+            self.hosts.record(host, outcome, started)
+
+    @staticmethod
+    def _result(status: int, http_status: int, size: int, attempts: int, error: Optional[str],
+                timings: RequestTimings, item_start: float, attempt_start: float, ttfb: float) -> ItemResult:
+        """Build a result; the latency breakdown describes the last attempt, ``total`` the whole item"""
+        end = perf_counter()
+        transfer = end - attempt_start - ttfb if ttfb else 0.0
+        return ItemResult(status, http_status, size, attempts, error, timings.dns, timings.connect,
+                          ttfb, transfer, end - item_start)
+
 
-        cap.release()
-        logger.info(f"Extracted {saved_frame_count} frames from {video_path}")
-        return frame_paths
+class PhotoLoader(MediaLoader):
+    media = "image"
+
+
+class VideoLoader(MediaLoader):
+    media = "video"
+    resumable = True
+
+    def extract_frames(self, video_path: str, output_folder: str, frame_rate: int = 1, mode: str = READ,
+                       writer: Optional["FrameWriter"] = None, sampler: Optional["FrameSampler"] = None) -> List[str]:
+        """Extract frames from video at specified frame rate.
+
+        ``mode`` is ``"read"`` (decode every frame), ``"grab"`` (decode only
+        the kept frames) or ``"seek"`` (seek to each kept frame). ``writer``
+        sets the output format and encoding threads (JPEG by default), and
+        ``sampler`` drops near-duplicate frames or caps their number.
+        """
+        from .frames import FrameJob, extract_frames
+        return extract_frames(FrameJob(video_path, output_folder, frame_rate, mode, writer=writer, sampler=sampler))
+
+    def iter_frames(self, source: "VideoSource", frame_rate: float = 1, mode: str = READ,
+                    size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                    sampler: Optional["FrameSampler"] = None) -> Iterator[Tuple[float, "np.ndarray"]]:
+        """Yield ``(timestamp, frame)`` arrays from a video path or bytes without JPEG round-trips"""
+        from .frames import iter_frames
+        return iter_frames(source, frame_rate, mode, size, color, sampler)
+
+    def iter_frame_batches(self, source: "VideoSource", batch_size: int = 32, frame_rate: float = 1,
+                           mode: str = READ, size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                           sampler: Optional["FrameSampler"] = None) -> Iterator["FrameBatch"]:
+        """Yield stacked ``uint8`` frame batches with their timestamps"""
+        from .frames import iter_frame_batches
+        return iter_frame_batches(source, batch_size, frame_rate, mode, size, color, sampler)
+
+    def aiter_frames(self, source: "VideoSource", frame_rate: float = 1, mode: str = READ,
+                     size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                     sampler: Optional["FrameSampler"] = None) -> AsyncIterator[Tuple[float, "np.ndarray"]]:
+        """Async version of iter_frames"""
+        from .frames import aiter_frames
+        return aiter_frames(source, frame_rate, mode, size, color, sampler)
+
+    def aiter_frame_batches(self, source: "VideoSource", batch_size: int = 32, frame_rate: float = 1,
+                            mode: str = READ, size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                            sampler: Optional["FrameSampler"] = None) -> AsyncIterator["FrameBatch"]:
+        """Async version of iter_frame_batches"""
+        from .frames import aiter_frame_batches
+        return aiter_frame_batches(source, batch_size, frame_rate, mode, size, color, sampler)
+
+    async def aiter_url_frame_batches(self, session: aiohttp.ClientSession, url: str, batch_size: int = 32,
+                                      frame_rate: float = 1, mode: str = READ,
+                                      size: Optional[Tuple[int, int]] = None, color: str = "bgr",
+                                      sampler: Optional["FrameSampler"] = None) -> AsyncIterator["FrameBatch"]:
+        """Download a video into memory and yield its frame batches, without saving the video"""
+        from .frames import aiter_frame_batches
+        async with session.get(url, **self._request_kwargs()) as res:
+            res.raise_for_status()
+            body = await res.read()
+        async for batch in aiter_frame_batches(body, batch_size, frame_rate, mode, size, color, sampler):
+            yield batch
+
+
+MEDIA_LOADERS = {"photo": PhotoLoader, "video": VideoLoader}
+ResultCallback = Callable[[int, str, str, ItemResult], None]
+
+
+class _SizedZip:
+    """zip() that keeps len() of sized inputs for progress bars"""
+
+    def __init__(self, *iterables):
+        self.iterables = iterables
+
+    def __len__(self) -> int:
+        return min(len(iterable) for iterable in self.iterables)
+
+    def __iter__(self):
+        return zip(*self.iterables)
+
+
+def _zip_sized(*iterables):
+    if all(hasattr(iterable, "__len__") for iterable in iterables):
+        return _SizedZip(*iterables)
+    return zip(*iterables)
 
 
 class FastImagesLoader:
-    def __init__(self, batch_size=10):
+    # Frame extraction defaults, configurable on FastVideosLoader
+    extract_mode = READ
+    extract_workers = 1
+    segment_seconds = None
+    frame_writer = None
+    frame_sampler = None
+
+    def __init__(self, batch_size=10, max_in_flight: Optional[int] = None, per_host_limit: Optional[int] = None,
+                 transport: Optional[Transport] = None, session: Optional[aiohttp.ClientSession] = None,
+                 chunk_size: int = 64 * 1024, writer_threads: int = 8,
+                 manifest: Union[bool, str, JobManifest] = False, cache: Union[None, str, HttpCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None, host_limiter: Optional[HostLimiter] = None,
+                 keep_results: bool = True, sink: Optional[ShardWriter] = None,
+                 image_processor: Optional["ImageProcessor"] = None, metrics: Optional[Metrics] = None,
+                 max_bandwidth: Union[None, float, BandwidthLimiter, Sequence[BandwidthLimiter]] = None,
+                 max_file_size: Optional[int] = None, min_free_disk: Union[None, int, DiskWatermark] = None):
         self.batch_size = batch_size
+        # batch_size is kept as the default window size for backward compatibility
+        self.max_in_flight = max_in_flight or batch_size
+        self.per_host_limit = per_host_limit
+        self.transport = transport or Transport(limit=max(100, self.max_in_flight),
+                                                limit_per_host=per_host_limit or 0)
+        # An injected session is never closed by the loader
+        self.session = session
+        self._owned_session = None
+        self.chunk_size = chunk_size
+        self.writer_threads = writer_threads
+        # True stores the manifest in data_folder, a string is a manifest path
+        self.manifest = manifest
+        # Opt-in conditional request cache; a string is the cache directory
+        self.cache = HttpCache(cache) if isinstance(cache, str) else cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Adaptive per-host concurrency and rate limits; per_host_limit stays an upper bound
+        self.host_limiter = host_limiter
+        # False keeps only counters and failed items in DownloadResults, for flat memory on huge jobs
+        self.keep_results = keep_results
+        # Downloads are packed into tar shards instead of being written to their paths
+        self.sink = sink
+        # Validates, resizes and re-encodes photos before they are stored
+        self.image_processor = image_processor
+        # Live counters, lifecycle hooks, periodic stats and event loop lag sampling
+        self.metrics = metrics
+        # Bytes per second for this loader, or limiters that may be shared with other loaders for a global cap
+        if max_bandwidth is None:
+            self.max_bandwidth = []
+        elif isinstance(max_bandwidth, (int, float)):
+            self.max_bandwidth = [BandwidthLimiter(max_bandwidth)]
+        elif isinstance(max_bandwidth, BandwidthLimiter):
+            self.max_bandwidth = [max_bandwidth]
+        else:
+            self.max_bandwidth = list(max_bandwidth)
+        # Downloads larger than this fail with FileTooLarge, checked against Content-Length and while streaming
+        self.max_file_size = max_file_size
+        # New downloads wait while the target disk has less free space than this many bytes
+        self.min_free_disk = DiskWatermark(min_free_disk) if isinstance(min_free_disk, int) else min_free_disk
 
-    async def _load_photos_from_bucket(self, session, photo_urls, photo_paths, data_folder: str) -> None:
-        basket = PhotoLoader()
-        tasks = [basket.request(session, photo_url, photo_path) for photo_url, photo_path in zip(photo_urls, photo_paths)]
-        await asyncio.gather(*tasks)
+    async def open(self) -> aiohttp.ClientSession:
+        """Open a session shared by all following async ``load_*`` calls"""
+        if self.session is None:
+            self._owned_session = self.session = self.transport.create_session()
+        return self.session
 
-    async def _load_videos_from_bucket(self, session, video_urls, video_paths, data_folder: str) -> None:
-        basket = VideoLoader()
-        tasks = [basket.request(session, video_url, video_path) for video_url, video_path in zip(video_urls, video_paths)]
-        await asyncio.gather(*tasks)
+    async def close(self) -> None:
+        if self._owned_session is not None:
+            await self._owned_session.close()
+            self._owned_session = self.session = None
 
-    async def load_photos_to_folder_async(self, photo_urls: List[str], photo_paths: List[str], data_folder: str) -> None:
-        """Async version of load_photos_to_folder"""
-        os.makedirs(data_folder, exist_ok=True)
-        logger.info(f"Loading {len(photo_paths)} photos in batches of {self.batch_size}")
-        async with aiohttp.ClientSession() as session:
-            for i in tqdm(range(0, len(photo_urls), self.batch_size), desc="Downloading photos"):
-                batch_urls = photo_urls[i:i + self.batch_size]
-                batch_paths = photo_paths[i:i + self.batch_size]
-                await self._load_photos_from_bucket(session, batch_urls, batch_paths, data_folder)
-
-    def load_photos_to_folder(self, photo_urls: List[str], photo_paths: List[str], data_folder: str) -> None:
-        os.makedirs(data_folder, exist_ok=True)
-        logger.info(f"Loading {len(photo_paths)} photos in batches of {self.batch_size}")
-        async def run_batches():
-            async with aiohttp.ClientSession() as session:
-                for i in tqdm(range(0, len(photo_urls), self.batch_size), desc="Downloading photos"):
-                    batch_urls = photo_urls[i:i + self.batch_size]
-                    batch_paths = photo_paths[i:i + self.batch_size]
-                    await self._load_photos_from_bucket(session, batch_urls, batch_paths, data_folder)
-        
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @asynccontextmanager
+    async def _session_scope(self):
+        if self.session is not None and not self.session.closed:
+            yield self.session
+            return
+        async with self.transport.create_session() as session:
+            yield session
+
+    def _scheduler(self) -> SlidingWindowScheduler:
+        return SlidingWindowScheduler(self.max_in_flight, self.per_host_limit, host_limiter=self.host_limiter,
+                                      retry_policy=self.retry_policy)
+
+    def host_stats(self) -> Dict[str, dict]:
+        """Per-host limits and outcome counters collected by the host limiter"""
+        return self.host_limiter.stats() if self.host_limiter is not None else {}
+
+    def _open_manifest(self, data_folder: str) -> Optional[JobManifest]:
+        if isinstance(self.manifest, JobManifest):
+            return self.manifest
+        if self.manifest is True:
+            return JobManifest.for_folder(data_folder)
+        if self.manifest:
+            return JobManifest(self.manifest)
+        return None
+
+    def _progress(self, total: Optional[int], desc: str):
+        from tqdm.asyncio import tqdm
+        return tqdm(total=total, desc=desc)
+
+    @asynccontextmanager
+    async def _monitoring(self):
+        if self.metrics is None:
+            yield
+            return
+        async with self.metrics.monitoring():
+            yield
+
+    async def _load_from_pairs(self, session, loader_class, pairs, data_folder: str, desc: str,
+                               total: Optional[int] = None, on_result: Optional[ResultCallback] = None,
+                               manifest: Optional[JobManifest] = None) -> DownloadResults:
+        """Download all ``(url, path)`` pairs and collect a result row per item.
+
+        A ``manifest`` passed in belongs to the caller and is only flushed.
+        """
+        owned = manifest is None
+        if owned:
+            manifest = self._open_manifest(data_folder)
+        results = DownloadResults(keep_rows=self.keep_results)
+
+        def record(index, url, path, result):
+            results.append(index, url, path, result)
+            if self.metrics is not None:
+                self.metrics.emit(ITEM_DONE, index=index, url=url, path=path, result=result)
+            if on_result is not None:
+                on_result(index, url, path, result)
+
+        async def handle(url, path, index):
+            result = await basket.request(session, url, path)
+            if not isinstance(result, ItemResult):
+                # Plain truthy/falsy return values of custom request implementations
+                result = ItemResult(OK if result else FAILED)
+            record(index, url, path, result)
+
+        processor = self.image_processor if loader_class.media == "image" else None
         try:
-            # Try to get the current event loop
-            loop = asyncio.get_running_loop()
-            # If we're in an async context, we need to run this differently
-            # For now, just run it synchronously in the current loop
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, run_batches())
-                future.result()
-        except RuntimeError:
-            # No event loop running, safe to use asyncio.run
-            asyncio.run(run_batches())
+            with ThreadPoolExecutor(self.writer_threads, thread_name_prefix="fil-writer") as executor, \
+                    (processor.executor() if processor is not None else nullcontext()) as processor_executor, \
+                    self._progress(total, desc) as progress:
+                basket = loader_class(chunk_size=self.chunk_size, executor=executor, manifest=manifest,
+                                      cache=self.cache, retry=self.retry_policy,
+                                      hosts=self.host_limiter, sink=self.sink, processor=processor,
+                                      processor_executor=processor_executor, metrics=self.metrics,
+                                      bandwidth=self.max_bandwidth, max_file_size=self.max_file_size,
+                                      disk=self.min_free_disk, admitted=True)
+                try:
+                    async with self._monitoring():
+                        await self._scheduler().run(self._pending_pairs(pairs, manifest, record, progress,
+                                                                        check_files=self.sink is None),
+                                                    handle, progress)
+                finally:
+                    await basket.sync_sink()
+        finally:
+            if manifest is not None and (not owned or manifest is self.manifest):
+                manifest.flush()
+            elif manifest is not None:
+                manifest.close()
+        summary = results.summary()
+        if summary["failed"]:
+            logger.warning(f"{summary['failed']} of {len(results)} downloads failed")
+        if self.host_limiter is not None:
+            self.host_limiter.log_stats()
+        return results
 
-    async def load_videos_to_folder_async(self, video_urls: List[str], video_paths: List[str], data_folder: str) -> None:
-        """Async version of load_videos_to_folder"""
-        os.makedirs(data_folder, exist_ok=True)
-        logger.info(f"Loading {len(video_paths)} videos in batches of {self.batch_size}")
-        async with aiohttp.ClientSession() as session:
-            for i in tqdm(range(0, len(video_urls), self.batch_size), desc="Downloading videos"):
-                batch_urls = video_urls[i:i + self.batch_size]
-                batch_paths = video_paths[i:i + self.batch_size]
-                await self._load_videos_from_bucket(session, batch_urls, batch_paths, data_folder)
-
-    def load_videos_to_folder(self, video_urls: List[str], video_paths: List[str], data_folder: str) -> None:
-        os.makedirs(data_folder, exist_ok=True)
-        logger.info(f"Loading {len(video_paths)} videos in batches of {self.batch_size}")
-        async def run_batches():
-            async with aiohttp.ClientSession() as session:
-                for i in tqdm(range(0, len(video_urls), self.batch_size), desc="Downloading videos"):
-                    batch_urls = video_urls[i:i + self.batch_size]
-                    batch_paths = video_paths[i:i + self.batch_size]
-                    await self._load_videos_from_bucket(session, batch_urls, batch_paths, data_folder)
-        
+    @staticmethod
+    async def _pending_pairs(pairs, manifest: Optional[JobManifest], record: ResultCallback, progress,
+                             check_files: bool = True):
+        """Number the pairs and skip items that the manifest reports as already downloaded.
+
+        Files written to a sink never appear at their paths, so ``check_files=False`` trusts the manifest.
+        """
+        skipped = 0
+        index = 0
+        async for url, path in as_async_iterator(pairs):
+            if manifest is not None and manifest.is_done(url, path, check_files):
+                skipped += 1
+                record(index, url, path, ItemResult(SKIPPED))
+                progress.update(1)
+            else:
+                yield url, path, index
+            index += 1
+        if skipped:
+            logger.info(f"Skipped {skipped} items already completed according to the manifest")
+
+    @staticmethod
+    def _run_sync(coro):
+        _apply_nest_asyncio()
         try:
-            # Try to get the current event loop
             asyncio.get_running_loop()
-            # If we're in an async context, we need to run this differently
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, run_batches())
-                future.result()
         except RuntimeError:
             # No event loop running, safe to use asyncio.run
-            asyncio.run(run_batches())
+            return asyncio.run(coro)
+        # We're already inside a running loop, run in a separate thread with its own loop
+        with ThreadPoolExecutor() as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+    def _shard_config(self) -> dict:
+        """Constructor arguments for the loaders of worker processes; sessions are never shared"""
+        return dict(batch_size=self.batch_size, max_in_flight=self.max_in_flight,
+                    per_host_limit=self.per_host_limit, transport=self.transport, chunk_size=self.chunk_size,
+                    writer_threads=self.writer_threads, manifest=self.manifest, cache=self.cache,
+                    retry_policy=self.retry_policy, host_limiter=self.host_limiter,
+                    keep_results=self.keep_results, sink=self.sink, image_processor=self.image_processor,
+                    max_bandwidth=self.max_bandwidth, max_file_size=self.max_file_size,
+                    min_free_disk=self.min_free_disk)
+
+    async def load_pairs_to_folder_async(self, pairs: Union[Iterable[Tuple[str, str]], AsyncIterable[Tuple[str, str]]],
+                                         data_folder: str, media: str = "photo",
+                                         on_result: Optional[ResultCallback] = None) -> DownloadResults:
+        """Download ``(url, path)`` pairs from any iterable or async iterable.
+
+        Pairs are consumed lazily as download slots free up, so generators
+        over inputs larger than memory (see ``PairSource``) are fine.
+        ``on_result(index, url, path, result)`` is called from the event loop
+        as soon as each item is finished or skipped.
+        """
+        return await self._load_pairs_async(pairs, data_folder, media, on_result)
+
+    async def _load_pairs_async(self, pairs, data_folder: str, media: str, on_result: Optional[ResultCallback],
+                                manifest: Optional[JobManifest] = None) -> DownloadResults:
+        os.makedirs(data_folder, exist_ok=True)
+        total = len(pairs) if hasattr(pairs, "__len__") else None
+        if not hasattr(pairs, "__aiter__"):
+            # Files and stdin block on reads, so sync inputs are read ahead in a worker thread
+            pairs = prefetch(pairs)
+        logger.info(f"Loading {total if total is not None else 'streamed'} {media}s "
+                    f"with {self.max_in_flight} downloads in flight")
+        async with self._session_scope() as session:
+            return await self._load_from_pairs(session, MEDIA_LOADERS[media], pairs, data_folder,
+                                               f"Downloading {media}s", total, on_result, manifest)
+
+    def load_pairs_to_folder(self, pairs: Iterable[Tuple[str, str]], data_folder: str,
+                             media: str = "photo") -> DownloadResults:
+        return self._run_sync(self.load_pairs_to_folder_async(pairs, data_folder, media))
+
+    def load_pairs_to_folder_sharded(self, pairs: Iterable[Tuple[str, str]], data_folder: str,
+                                     media: str = "photo", workers: Optional[int] = None) -> DownloadResults:
+        """Multi-process version of load_pairs_to_folder.
+
+        The items are split across ``workers`` processes (CPU count by
+        default), each running its own event loop and session with this
+        loader's settings, so ``max_in_flight``, ``per_host_limit`` and
+        ``max_bandwidth`` apply per process. A ``PairSource`` is read by every worker, which keeps
+        only its own share; other iterables are materialized first. Results
+        of all workers are merged, with ``index`` referring to positions in
+        the full input. ``metrics`` are not collected in this mode.
+        """
+        from .sharding import load_sharded
+        if self.metrics is not None:
+            logger.warning("Metrics are not collected from worker processes")
+        return load_sharded(self._shard_config(), media, pairs, data_folder, workers)
+
+    async def load_photos_to_folder_async(self, photo_urls: List[str], photo_paths: List[str],
+                                          data_folder: str) -> DownloadResults:
+        """Async version of load_photos_to_folder"""
+        return await self.load_pairs_to_folder_async(_zip_sized(photo_urls, photo_paths), data_folder, "photo")
+
+    def load_photos_to_folder(self, photo_urls: List[str], photo_paths: List[str],
+                              data_folder: str) -> DownloadResults:
+        """Download photos and return a result row per item"""
+        return self._run_sync(self.load_photos_to_folder_async(photo_urls, photo_paths, data_folder))
+
+    def load_photos_to_folder_sharded(self, photo_urls: List[str], photo_paths: List[str], data_folder: str,
+                                      workers: Optional[int] = None) -> DownloadResults:
+        """Multi-process version of load_photos_to_folder, see load_pairs_to_folder_sharded"""
+        return self.load_pairs_to_folder_sharded(list(zip(photo_urls, photo_paths)), data_folder, "photo", workers)
+
+    async def load_videos_to_folder_async(self, video_urls: List[str], video_paths: List[str],
+                                          data_folder: str) -> DownloadResults:
+        """Async version of load_videos_to_folder"""
+        return await self.load_pairs_to_folder_async(_zip_sized(video_urls, video_paths), data_folder, "video")
+
+    def load_videos_to_folder(self, video_urls: List[str], video_paths: List[str],
+                              data_folder: str) -> DownloadResults:
+        """Download videos and return a result row per item"""
+        return self._run_sync(self.load_videos_to_folder_async(video_urls, video_paths, data_folder))
+
+    def load_videos_to_folder_sharded(self, video_urls: List[str], video_paths: List[str], data_folder: str,
+                                      workers: Optional[int] = None) -> DownloadResults:
+        """Multi-process version of load_videos_to_folder, see load_pairs_to_folder_sharded"""
+        return self.load_pairs_to_folder_sharded(list(zip(video_urls, video_paths)), data_folder, "video", workers)
+
+    def extract_frames_from_videos(self, video_folder: str, frames_output_folder: str, frame_rate: int = 1,
+                                   mode: Optional[str] = None, workers: Optional[int] = None,
+                                   segment_seconds: Optional[float] = None,
+                                   writer: Optional["FrameWriter"] = None,
+                                   sampler: Optional["FrameSampler"] = None) -> List[str]:
+        """Extract frames from all videos in a folder.
+
+        Videos, and segments of ``segment_seconds`` of long videos, are spread
+        over ``workers`` processes. Settings left as None fall back to the
+        loader's ``extract_mode``, ``extract_workers``, ``segment_seconds``,
+        ``frame_writer`` and ``frame_sampler``.
+        """
+        from .frames import extract_frames_parallel, plan_jobs
+        mode = mode or self.extract_mode
+        workers = workers or self.extract_workers
+        segment_seconds = segment_seconds or self.segment_seconds
 
-    def extract_frames_from_videos(self, video_folder: str, frames_output_folder: str, frame_rate: int = 1) -> List[str]:
-        """Extract frames from all videos in a folder"""
-        video_loader = VideoLoader()
-        all_frame_paths = []
-        
         video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-        video_files = [f for f in os.listdir(video_folder) 
-                      if any(f.lower().endswith(ext) for ext in video_extensions)]
-        
-        for video_file in tqdm(video_files, desc="Extracting frames"):
+        video_files = sorted(f for f in os.listdir(video_folder)
+                             if any(f.lower().endswith(ext) for ext in video_extensions))
+
+        jobs = []
+        for video_file in video_files:
             video_path = os.path.join(video_folder, video_file)
             video_name = os.path.splitext(video_file)[0]
             video_frames_folder = os.path.join(frames_output_folder, video_name)
-            
-            frame_paths = video_loader.extract_frames(video_path, video_frames_folder, frame_rate)
-            all_frame_paths.extend(frame_paths)
-        
-        return all_frame_paths
+            jobs.extend(plan_jobs(video_path, video_frames_folder, frame_rate, mode, segment_seconds,
+                                  writer or self.frame_writer, sampler or self.frame_sampler))
+
+        return extract_frames_parallel(jobs, workers)
 
 
 class FastVideosLoader(FastImagesLoader):
     """Specialized loader for videos with frame extraction capabilities"""
     
-    def __init__(self, batch_size=5):  # Smaller batch size for videos
-        super().__init__(batch_size)
+    def __init__(self, batch_size=5, extract_mode: str = READ, extract_workers: int = 1,
+                 segment_seconds: Optional[float] = None, frame_writer: Optional["FrameWriter"] = None,
+                 frame_sampler: Optional["FrameSampler"] = None, **kwargs):  # Smaller batch size for videos
+        super().__init__(batch_size, **kwargs)
+        self.extract_mode = extract_mode
+        self.extract_workers = extract_workers
+        self.segment_seconds = segment_seconds
+        self.frame_writer = frame_writer
+        self.frame_sampler = frame_sampler
+
+    async def load_pairs_and_extract_frames_async(self, pairs: Union[Iterable[Tuple[str, str]],
+                                                                     AsyncIterable[Tuple[str, str]]],
+                                                  data_folder: str, frame_rate: int = 1,
+                                                  delete_videos: bool = False,
+                                                  max_pending: Optional[int] = None) -> List[str]:
+        """Download videos and extract the frames of each one as soon as it is downloaded.
+
+        Extraction runs in a pool of ``extract_workers`` processes while the
+        remaining downloads continue. At most ``max_pending`` videos are
+        downloading or waiting for extraction at any time, so a slow
+        extractor throttles the downloads instead of filling the disk. With
+        ``delete_videos`` every video is removed once its frames are written;
+        a manifest then records the video as extracted, so reruns skip it.
+        Frames go to ``data_folder/frames/<video name>`` and are returned in
+        input order. Failed extractions are logged per video and the first
+        one is raised once all the others finished.
+        """
+        if self.sink is not None:
+            raise ValueError("Frames are extracted from videos on disk; shard the frames with "
+                             "frame_writer=FrameWriter(sink=...) instead of sharding the videos")
+        from . import frames
+        frames_folder = os.path.join(data_folder, "frames")
+        max_pending = max_pending or self.max_in_flight + 2 * self.extract_workers
+        pending = asyncio.Semaphore(max_pending)
+        loop = asyncio.get_running_loop()
+        frame_paths: Dict[int, List[str]] = {}
+        failures: Dict[int, Exception] = {}
+        # Shared with the downloads, so that a single connection writes the manifest
+        manifest = self._open_manifest(data_folder)
+        extractions = set()
+
+        async def bounded_pairs():
+            async for pair in (pairs if hasattr(pairs, "__aiter__") else prefetch(pairs)):
+                await pending.acquire()
+                yield pair
+
+        async def extract(index, url, video_path):
+            started = time.monotonic()
+            try:
+                video_name = os.path.splitext(os.path.basename(video_path))[0]
+                jobs = await loop.run_in_executor(None, frames.plan_jobs, video_path,
+                                                  os.path.join(frames_folder, video_name), frame_rate,
+                                                  self.extract_mode, self.segment_seconds, self.frame_writer,
+                                                  self.frame_sampler)
+                segments = await asyncio.gather(*(loop.run_in_executor(pool, frames.extract_frames, job)
+                                               for job in jobs))
+                frame_paths[index] = [path for paths in segments for path in paths]
+                if delete_videos:
+                    await aiofiles.os.remove(video_path)
+                    if manifest is not None:
+                        manifest.mark_extracted(url, video_path)
+            except Exception as e:
+                # Kept for the caller, a done callback would drop the exception
+                failures[index] = e
+                logger.error(f"Failed to extract frames from {video_path}: {e!r}")
+            finally:
+                pending.release()
+                if self.metrics is not None:
+                    self.metrics.emit(EXTRACT_DONE, video=video_path, frames=len(frame_paths.get(index, ())),
+                                      seconds=time.monotonic() - started)
+
+        def on_result(index, url, path, result):
+            if result.status != FAILED and os.path.exists(path):
+                if self.metrics is not None:
+                    self.metrics.emit(EXTRACT_QUEUED, video=path)
+                task = asyncio.ensure_future(extract(index, url, path))
+                extractions.add(task)
+                task.add_done_callback(extractions.discard)
+            else:
+                pending.release()
+
+        sink = self.frame_writer.sink if self.frame_writer is not None else None
+        try:
+            async with self._monitoring():
+                with frames.extraction_executor(self.extract_workers, processes=sink is None) as pool:
+                    await self._load_pairs_async(bounded_pairs(), data_folder, "video", on_result, manifest)
+                    while extractions:
+                        await asyncio.gather(*list(extractions))
+        finally:
+            if manifest is not None and manifest is self.manifest:
+                manifest.flush()
+            elif manifest is not None:
+                manifest.close()
+        if failures:
+            logger.error(f"Frame extraction failed for {len(failures)} videos")
+            raise failures[min(failures)]
+        return [path for index in sorted(frame_paths) for path in frame_paths[index]]
+
+    def load_pairs_and_extract_frames(self, pairs: Iterable[Tuple[str, str]], data_folder: str, frame_rate: int = 1,
+                                      delete_videos: bool = False, max_pending: Optional[int] = None) -> List[str]:
+        """Pipelined download and frame extraction, see load_pairs_and_extract_frames_async"""
+        return self._run_sync(self.load_pairs_and_extract_frames_async(pairs, data_folder, frame_rate,
+                                                                       delete_videos, max_pending))
 
     def load_videos_and_extract_frames(self, video_urls: List[str], data_folder: str, 
-                                     frame_rate: int = 1, extract_frames: bool = True) -> Optional[List[str]]:
-        """Load videos and optionally extract frames"""
+                                     frame_rate: int = 1, extract_frames: bool = True, pipelined: bool = False,
+                                     delete_videos: bool = False) -> Optional[List[str]]:
+        """Load videos and optionally extract frames.
+
+        With ``pipelined=True`` frames are extracted while the remaining
+        videos download, see load_pairs_and_extract_frames_async.
+        """
         video_paths = [os.path.join(data_folder, f"video_{i}.mp4") for i in range(len(video_urls))]
-        
+
+        if extract_frames and pipelined:
+            return self.load_pairs_and_extract_frames(_zip_sized(video_urls, video_paths), data_folder, frame_rate,
+                                                      delete_videos)
+
         # Download videos
         self.load_videos_to_folder(video_urls, video_paths, data_folder)
         
@@ -215,17 +911,129 @@ class FastVideosLoader(FastImagesLoader):
         return None
 
 
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']
+
+
+def _detect_media_type(url: str) -> str:
+    path = urlsplit(url).path.lower()
+    if any(path.endswith(ext) for ext in VIDEO_EXTENSIONS):
+        return 'video'
+    if any(path.endswith(ext) for ext in IMAGE_EXTENSIONS):
+        return 'photo'
+    logger.warning("Could not auto-detect media type, defaulting to photo")
+    return 'photo'
+
+
+def _parse_size(value: str) -> Tuple[int, int]:
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Load photos and videos from URLs to a specified folder.")
-    parser.add_argument("urls", type=str, nargs='+', help="List of URLs to download.")
+    parser.add_argument("urls", type=str, nargs='*', help="List of URLs to download.")
     parser.add_argument("data_folder", type=str, help="Folder to save downloaded files.")
+    parser.add_argument("--input", type=str, default=None,
+                       help="Read URLs (and optional paths) from a file, or '-' for stdin, instead of arguments.")
+    parser.add_argument("--input_format", type=str, choices=['auto'] + list(INPUT_FORMATS), default='auto',
+                       help="Format of --input: txt (one URL per line, optional tab-separated path), csv or "
+                            "jsonl with url/path columns, parquet (needs pyarrow). 'auto' uses the extension.")
     parser.add_argument("--batch_size", type=int, default=10, help="Number of files to download in each batch. Default is 10.")
+    parser.add_argument("--max_in_flight", type=int, default=None,
+                       help="Number of downloads kept running at all times. Defaults to batch_size.")
+    parser.add_argument("--per_host_limit", type=int, default=None,
+                       help="Maximum number of concurrent downloads per host. Unlimited by default.")
+    parser.add_argument("--connect_timeout", type=float, default=5.0,
+                       help="Connection timeout in seconds. Default is 5.")
+    parser.add_argument("--read_timeout", type=float, default=30.0,
+                       help="Timeout between two reads from a socket in seconds. Default is 30.")
+    parser.add_argument("--dns_cache_ttl", type=int, default=300,
+                       help="How long resolved DNS entries are cached, in seconds. Default is 300.")
+    parser.add_argument("--aiodns", action='store_true',
+                       help="Resolve hosts with aiodns (must be installed separately).")
+    parser.add_argument("--resume", action='store_true',
+                       help="Keep a job manifest in data_folder, skip completed items and resume partial videos.")
+    parser.add_argument("--cache_dir", type=str, default=None,
+                       help="Directory of the conditional-request cache and deduplicating blob store.")
+    parser.add_argument("--cache_max_mb", type=int, default=None,
+                       help="Maximum size of the cache blob store in megabytes. Unlimited by default.")
+    parser.add_argument("--adaptive_hosts", action='store_true',
+                       help="Adapt concurrency per host (AIMD): grow on success, shrink on 429/5xx/timeouts.")
+    parser.add_argument("--host_rate", type=float, default=None,
+                       help="Maximum requests per second per host. Unlimited by default.")
+    parser.add_argument("--max_attempts", type=int, default=3,
+                       help="Attempts per item for transient failures (timeouts, 429, 5xx). Default is 3.")
+    parser.add_argument("--retry_budget", type=int, default=None,
+                       help="Maximum number of retries for the whole job. Unlimited by default.")
+    parser.add_argument("--breaker_threshold", type=int, default=None,
+                       help="Pause a host after this many consecutive transient failures. Disabled by default.")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of download processes. Default is 1 (single event loop).")
     parser.add_argument("--media_type", type=str, choices=['photo', 'video', 'auto'], default='auto', 
                        help="Type of media to download. 'auto' detects based on URL extension.")
     parser.add_argument("--extract_frames", action='store_true', 
                        help="Extract frames from videos (only applicable for video downloads).")
     parser.add_argument("--frame_rate", type=int, default=1, 
                        help="Frame extraction rate (frames per second). Default is 1.")
+    parser.add_argument("--extract_mode", type=str, choices=list(EXTRACT_MODES), default=READ,
+                       help="'read' decodes every frame, 'grab' decodes only kept frames, 'seek' seeks to each "
+                            "kept frame (best for sparse sampling). Default is 'read'.")
+    parser.add_argument("--extract_workers", type=int, default=1,
+                       help="Number of frame extraction processes. Default is 1.")
+    parser.add_argument("--segment_seconds", type=float, default=None,
+                       help="Split long videos into segments of this many seconds extracted in parallel.")
+    parser.add_argument("--frame_format", type=str, choices=list(FRAME_FORMATS), default='jpg',
+                       help="Format of extracted frames: jpg, png, webp or raw npy arrays. Default is jpg.")
+    parser.add_argument("--frame_quality", type=int, default=None,
+                       help="JPEG/WebP quality (0-100) or PNG compression level (0-9) of extracted frames.")
+    parser.add_argument("--frame_size", type=_parse_size, default=None,
+                       help="Resize extracted frames to WIDTHxHEIGHT, e.g. 224x224.")
+    parser.add_argument("--encode_threads", type=int, default=4,
+                       help="Threads encoding and writing frames per extraction process. Default is 4.")
+    parser.add_argument("--scene_threshold", type=float, default=None,
+                       help="Keep a frame only if it differs from the last kept one by more than this (0-1), "
+                            "e.g. 0.05.")
+    parser.add_argument("--dedup_distance", type=int, default=None,
+                       help="Drop frames whose perceptual hash is within this many bits of the last kept frame.")
+    parser.add_argument("--max_frames", type=int, default=None,
+                       help="Keep at most this many frames per video (per segment with --segment_seconds).")
+    parser.add_argument("--shards", action='store_true',
+                       help="Pack photos and extracted frames into tar shards with an index in data_folder/shards "
+                            "instead of writing one file each.")
+    parser.add_argument("--shard_size_mb", type=int, default=1024,
+                       help="Maximum size of a shard in MB. Default is 1024.")
+    parser.add_argument("--validate", action='store_true',
+                       help="Reject photos whose Content-Type, magic bytes or decoding show they are not valid "
+                            "images, before they are stored.")
+    parser.add_argument("--max_side", type=int, default=None,
+                       help="Downscale photos whose longer side exceeds this many pixels (implies --validate).")
+    parser.add_argument("--image_format", type=str, choices=list(IMAGE_FORMATS), default=None,
+                       help="Re-encode photos in this format (implies --validate).")
+    parser.add_argument("--image_quality", type=int, default=None,
+                       help="JPEG/WebP quality used when photos are re-encoded.")
+    parser.add_argument("--pipeline", action='store_true',
+                       help="Extract frames of each video as soon as it is downloaded, overlapping downloads "
+                            "and extraction.")
+    parser.add_argument("--delete_videos", action='store_true',
+                       help="Delete each video after its frames are extracted (with --pipeline).")
+    parser.add_argument("--chunk_kb", type=int, default=64,
+                       help="Size of the chunks bodies are read and written in, in KB. Default is 64.")
+    parser.add_argument("--max_bandwidth", type=float, default=None,
+                       help="Maximum download bandwidth of the job in MB/s (per process with --workers).")
+    parser.add_argument("--max_file_size_mb", type=float, default=None,
+                       help="Fail downloads larger than this many MB without writing them.")
+    parser.add_argument("--min_free_disk_mb", type=int, default=None,
+                       help="Pause new downloads while the target disk has less free space than this many MB.")
+    parser.add_argument("--metrics_port", type=int, default=None,
+                       help="Serve live metrics in the Prometheus text format on this local port.")
+    parser.add_argument("--stats_interval", type=float, default=None,
+                       help="Log throughput, in-flight requests, retries and errors every this many seconds.")
+    parser.add_argument("--loop_lag", action='store_true',
+                       help="Sample the event loop lag and warn about stalls.")
     
     args = parser.parse_args()
 
@@ -235,34 +1043,86 @@ def main():
     media_type = args.media_type
     extract_frames = args.extract_frames
     frame_rate = args.frame_rate
+    transport = Transport(limit=max(100, args.max_in_flight or batch_size), limit_per_host=args.per_host_limit or 0,
+                          connect_timeout=args.connect_timeout, read_timeout=args.read_timeout,
+                          ttl_dns_cache=args.dns_cache_ttl, use_aiodns=args.aiodns)
+    cache = HttpCache(args.cache_dir, args.cache_max_mb * 1024 * 1024 if args.cache_max_mb else None) \
+        if args.cache_dir else None
+    concurrency = dict(max_in_flight=args.max_in_flight, per_host_limit=args.per_host_limit, transport=transport,
+                       manifest=args.resume, cache=cache,
+                       retry_policy=RetryPolicy(max_attempts=args.max_attempts, retry_budget=args.retry_budget,
+                                                breaker_threshold=args.breaker_threshold),
+                       host_limiter=HostLimiter(adaptive=args.adaptive_hosts, rate=args.host_rate)
+                       if args.adaptive_hosts or args.host_rate else None)
+    metrics = Metrics(log_interval=args.stats_interval, sample_loop_lag=args.loop_lag, port=args.metrics_port) \
+        if args.metrics_port is not None or args.stats_interval or args.loop_lag else None
+    concurrency.update(metrics=metrics, chunk_size=args.chunk_kb * 1024,
+                       max_bandwidth=args.max_bandwidth * 1024 * 1024 if args.max_bandwidth else None,
+                       max_file_size=int(args.max_file_size_mb * 1024 * 1024) if args.max_file_size_mb else None,
+                       min_free_disk=args.min_free_disk_mb * 1024 * 1024 if args.min_free_disk_mb else None)
 
-    # Detect media type if auto
-    if media_type == 'auto':
-        video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm']
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']
-        
-        # Check first URL to determine type
-        first_url_lower = urls[0].lower()
-        if any(first_url_lower.endswith(ext) for ext in video_extensions):
-            media_type = 'video'
-        elif any(first_url_lower.endswith(ext) for ext in image_extensions):
-            media_type = 'photo'
-        else:
-            logger.warning("Could not auto-detect media type, defaulting to photo")
-            media_type = 'photo'
+    if not urls and not args.input:
+        parser.error("either URLs or --input must be given")
+
+    if args.input:
+        pairs = PairSource(args.input, data_folder, args.input_format)
+        first_url = pairs.first_url()
+        if first_url is None:
+            logger.warning(f"No URLs found in {args.input}")
+            return
+        if media_type == 'auto':
+            media_type = _detect_media_type(first_url)
+        # Nothing was iterated yet, so every generated path gets the right media name and extension
+        pairs.media, pairs.extension = media_type, DEFAULT_EXTENSIONS[media_type]
+    else:
+        if media_type == 'auto':
+            # Check first URL to determine type
+            media_type = _detect_media_type(urls[0])
+        extension = DEFAULT_EXTENSIONS[media_type]
+        pairs = [(url, os.path.join(data_folder, f"{media_type}_{i}{extension}")) for i, url in enumerate(urls)]
 
+    # Videos are needed as files for frame extraction, so only photos and frames go into shards
+    sink = ShardWriter(os.path.join(data_folder, "shards"), max_bytes=args.shard_size_mb * 1024 * 1024,
+                       root=data_folder) if args.shards else None
+    loader_class = FastVideosLoader if media_type == 'video' else FastImagesLoader
     if media_type == 'video':
-        if extract_frames:
-            client_basket = FastVideosLoader(batch_size=batch_size)
-            client_basket.load_videos_and_extract_frames(urls, data_folder, frame_rate, extract_frames)
-        else:
-            video_paths = [os.path.join(data_folder, f"video_{i}.mp4") for i in range(len(urls))]
-            client_basket = FastImagesLoader(batch_size=batch_size)
-            client_basket.load_videos_to_folder(urls, video_paths, data_folder)
+        from .encoding import FrameWriter
+        from .sampling import FrameSampler
+        png = args.frame_format == 'png'
+        frame_writer = FrameWriter(args.frame_format, quality=None if png else args.frame_quality,
+                                   compression=args.frame_quality if png else None, size=args.frame_size,
+                                   threads=args.encode_threads, sink=sink)
+        concurrency.update(extract_mode=args.extract_mode, extract_workers=args.extract_workers,
+                           segment_seconds=args.segment_seconds, frame_writer=frame_writer,
+                           frame_sampler=FrameSampler(args.scene_threshold, args.dedup_distance, args.max_frames)
+                           if args.scene_threshold is not None or args.dedup_distance is not None
+                           or args.max_frames is not None else None)
     else:
-        photo_paths = [os.path.join(data_folder, f"photo_{i}.jpg") for i in range(len(urls))]
-        client_basket = FastImagesLoader(batch_size=batch_size)
-        client_basket.load_photos_to_folder(urls, photo_paths, data_folder)
+        concurrency.update(sink=sink)
+        if args.validate or args.max_side or args.image_format:
+            from .processing import ImageProcessor
+            concurrency.update(image_processor=ImageProcessor(max_side=args.max_side, image_format=args.image_format,
+                                                              quality=args.image_quality))
+    client_basket = loader_class(batch_size=batch_size, keep_results=False, **concurrency)
+    try:
+        if media_type == 'video' and extract_frames and args.pipeline:
+            if args.workers > 1:
+                logger.warning("--pipeline downloads in a single process, ignoring --workers")
+            client_basket.load_pairs_and_extract_frames(pairs, data_folder, frame_rate, args.delete_videos)
+            return
+        if args.workers > 1:
+            client_basket.load_pairs_to_folder_sharded(pairs, data_folder, media_type, args.workers)
+        else:
+            client_basket.load_pairs_to_folder(pairs, data_folder, media_type)
+
+        if media_type == 'video' and extract_frames:
+            frames_folder = os.path.join(data_folder, "frames")
+            client_basket.extract_frames_from_videos(data_folder, frames_folder, frame_rate)
+    finally:
+        if sink is not None:
+            sink.close()
+        if metrics is not None:
+            metrics.close()
 
 
 if __name__ == "__main__":
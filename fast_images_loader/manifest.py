@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from typing import Optional
+
+ManifestEntry = namedtuple(
+    "ManifestEntry",
+    ["url", "path", "status", "size", "etag", "last_modified", "checksum", "attempts", "error"],
+)
+
+DONE = "done"
+PARTIAL = "partial"
+FAILED = "failed"
+# Done, and the video was deleted once its frames were extracted
+EXTRACTED = "extracted"
+
+
+class JobManifest:
+    """Persistent record of a download job stored in SQLite.
+
+    Every item is keyed by ``(url, path)`` and keeps its status, size,
+    validators (ETag / Last-Modified) and SHA-256 checksum. Re-running a job
+    with the same manifest skips items that already landed on disk, retries
+    failures and lets interrupted video downloads resume with HTTP Range.
+    Commits are batched, so a crash loses at most ``commit_every`` updates,
+    which are simply downloaded again on the next run.
+    """
+
+    DEFAULT_NAME = ".fast_images_loader.sqlite"
+
+    def __init__(self, path: str, commit_every: int = 100):
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " url TEXT NOT NULL, path TEXT NOT NULL, status TEXT NOT NULL,"
+            " size INTEGER, etag TEXT, last_modified TEXT, checksum TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0, error TEXT, updated_at REAL,"
+            " PRIMARY KEY (url, path))"
+        )
+        self._conn.commit()
+
+    def __reduce__(self):
+        # Worker processes reopen the database instead of sharing the connection
+        return type(self), (self.path, self.commit_every)
+
+    @classmethod
+    def for_folder(cls, data_folder: str, **kwargs) -> "JobManifest":
+        """Open the manifest stored next to the downloads in ``data_folder``"""
+        os.makedirs(data_folder, exist_ok=True)
+        return cls(os.path.join(data_folder, cls.DEFAULT_NAME), **kwargs)
+
+    def get(self, url: str, path: str) -> Optional[ManifestEntry]:
+        row = self._conn.execute(
+            "SELECT url, path, status, size, etag, last_modified, checksum, attempts, error"
+            " FROM items WHERE url = ? AND path = ?", (url, path)).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def is_done(self, url: str, path: str, check_file: bool = True) -> bool:
+        """True if the item was completed and its file is still on disk with the recorded size.
+
+        Pass ``check_file=False`` when files go to a sink instead of ``path``;
+        the ``done`` entry is trusted then.
+        """
+        entry = self.get(url, path)
+        if entry is not None and entry.status == EXTRACTED:
+            return True
+        if entry is None or entry.status != DONE:
+            return False
+        if not check_file:
+            return True
+        try:
+            return os.path.getsize(path) == entry.size
+        except OSError:
+            return False
+
+    def _upsert(self, url, path, status, size=None, etag=None, last_modified=None,
+                checksum=None, error=None, attempt: int = 1) -> None:
+        self._conn.execute(
+            "INSERT INTO items (url, path, status, size, etag, last_modified, checksum, attempts, error, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (url, path) DO UPDATE SET status = excluded.status, size = excluded.size,"
+            " etag = excluded.etag, last_modified = excluded.last_modified, checksum = excluded.checksum,"
+            " attempts = items.attempts + excluded.attempts, error = excluded.error, updated_at = excluded.updated_at",
+            (url, path, status, size, etag, last_modified, checksum, attempt, error, time.time()),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def mark_done(self, url: str, path: str, size: int, etag: Optional[str] = None,
+                  last_modified: Optional[str] = None, checksum: Optional[str] = None) -> None:
+        self._upsert(url, path, DONE, size, etag, last_modified, checksum)
+
+    def mark_partial(self, url: str, path: str, size: int, etag: Optional[str] = None,
+                     last_modified: Optional[str] = None, error: Optional[str] = None,
+                     count_attempt: bool = True) -> None:
+        """Record a partial download; ``count_attempt=False`` records the start of an attempt that is still running"""
+        self._upsert(url, path, PARTIAL, size, etag, last_modified, error=error, attempt=int(count_attempt))
+
+    def mark_extracted(self, url: str, path: str) -> None:
+        """Keep a done item done after its video was deleted once the frames were extracted"""
+        self._conn.execute("UPDATE items SET status = ?, updated_at = ? WHERE url = ? AND path = ?",
+                           (EXTRACTED, time.time(), url, path))
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.flush()
+
+    def mark_failed(self, url: str, path: str, error: str) -> None:
+        self._upsert(url, path, FAILED, error=error)
+
+    def count(self, status: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM items WHERE status = ?", (status,)).fetchone()[0]
+
+    def flush(self) -> None:
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
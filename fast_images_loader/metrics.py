@@ -0,0 +1,261 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from .hosts import ERROR, THROTTLED
+from .results import STATUS_NAMES
+
+# Lifecycle events passed to hooks as ``hook(event, fields)``
+REQUEST_START = "request_start"    # url, host, attempt
+REQUEST_END = "request_end"        # url, host, attempt, http_status, outcome, error, seconds
+ITEM_DONE = "item_done"            # index, url, path, result
+EXTRACT_QUEUED = "extract_queued"  # video
+EXTRACT_DONE = "extract_done"      # video, frames, seconds
+LOOP_LAG = "loop_lag"              # seconds
+EVENTS = (REQUEST_START, REQUEST_END, ITEM_DONE, EXTRACT_QUEUED, EXTRACT_DONE, LOOP_LAG)
+
+Hook = Callable[[str, dict], None]
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _HostCounters:
+    __slots__ = ("requests", "errors", "throttled")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+
+class Metrics:
+    """Live counters and lifecycle hooks of running jobs.
+
+    Loaders report every request attempt, finished item and, when frames are
+    extracted while downloading, every queued and extracted video through
+    ``emit``, which updates the counters and calls each hook with the event
+    name and its fields (see ``EVENTS``). Hooks run on the event loop and
+    should return quickly. Body bytes are counted per chunk without calling
+    hooks.
+
+    While a job runs, aggregated stats are logged every ``log_interval``
+    seconds, and with ``sample_loop_lag`` the event loop's lag is measured
+    every ``lag_interval`` seconds; lags above ``stall_threshold`` are logged
+    as warnings. With ``port`` the counters are served in the Prometheus text
+    format on ``http://<address>:<port>/metrics`` until ``close()``.
+    Counters of the multi-process ``*_sharded`` methods are not collected.
+    """
+
+    def __init__(self, hooks: Optional[List[Hook]] = None, log_interval: Optional[float] = None,
+                 sample_loop_lag: bool = False, lag_interval: float = 0.1, stall_threshold: float = 1.0,
+                 port: Optional[int] = None, address: str = "127.0.0.1"):
+        self.hooks = list(hooks or [])
+        self.log_interval = log_interval
+        self.sample_loop_lag = sample_loop_lag
+        self.lag_interval = lag_interval
+        self.stall_threshold = stall_threshold
+        self.port = port
+        self.address = address
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = None
+        self._monitors = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.retries = 0
+        self.bytes = 0
+        self.items = [0] * len(STATUS_NAMES)
+        self.hosts: Dict[str, _HostCounters] = defaultdict(_HostCounters)
+        self.extract_pending = 0
+        self.videos_extracted = 0
+        self.frames = 0
+        self.loop_lag = 0.0
+        self.loop_lag_max = 0.0
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def add_bytes(self, size: int) -> None:
+        self.bytes += size
+
+    def emit(self, event: str, **fields) -> None:
+        with self._lock:
+            self._count(event, fields)
+        for hook in self.hooks:
+            try:
+                hook(event, fields)
+            except Exception as e:
+                logger.warning(f"Metrics hook {hook!r} failed on {event}: {e}")
+
+    def _count(self, event: str, fields: dict) -> None:
+        if event == REQUEST_START:
+            self.requests += 1
+            self.in_flight += 1
+            self.hosts[fields["host"]].requests += 1
+            if fields["attempt"] > 1:
+                self.retries += 1
+        elif event == REQUEST_END:
+            self.in_flight -= 1
+            if fields["outcome"] == ERROR:
+                self.hosts[fields["host"]].errors += 1
+            elif fields["outcome"] == THROTTLED:
+                self.hosts[fields["host"]].throttled += 1
+        elif event == ITEM_DONE:
+            self.items[fields["result"].status] += 1
+        elif event == EXTRACT_QUEUED:
+            self.extract_pending += 1
+        elif event == EXTRACT_DONE:
+            self.extract_pending -= 1
+            self.videos_extracted += 1
+            self.frames += fields["frames"]
+        elif event == LOOP_LAG:
+            self.loop_lag = fields["seconds"]
+            self.loop_lag_max = max(self.loop_lag_max, self.loop_lag)
+
+    def snapshot(self) -> dict:
+        """Current counters, with rates averaged since the metrics were created"""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            items = sum(self.items)
+            return dict(elapsed=elapsed, requests=self.requests, in_flight=self.in_flight, retries=self.retries,
+                        bytes=self.bytes, bytes_per_s=self.bytes / elapsed if elapsed else 0.0,
+                        items=dict(zip(STATUS_NAMES, self.items)),
+                        items_per_s=items / elapsed if elapsed else 0.0,
+                        extract_pending=self.extract_pending, videos_extracted=self.videos_extracted,
+                        frames=self.frames, loop_lag=self.loop_lag, loop_lag_max=self.loop_lag_max,
+                        hosts={host: dict(requests=c.requests, errors=c.errors, throttled=c.throttled)
+                               for host, c in self.hosts.items()})
+
+    def prometheus(self) -> str:
+        """The counters in the Prometheus text exposition format"""
+        stats = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP fil_{name} {help_text}")
+            lines.append(f"# TYPE fil_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"fil_{name}{labels} {value}")
+
+        metric("requests_total", "counter", "HTTP request attempts started.", [("", stats["requests"])])
+        metric("in_flight", "gauge", "HTTP requests currently running.", [("", stats["in_flight"])])
+        metric("retries_total", "counter", "Request attempts after the first one of an item.",
+               [("", stats["retries"])])
+        metric("bytes_total", "counter", "Body bytes received.", [("", stats["bytes"])])
+        metric("items_total", "counter", "Finished items by status.",
+               [(f'{{status="{status}"}}', count) for status, count in stats["items"].items()])
+        hosts = sorted(stats["hosts"].items())
+        for field, help_text in (("requests", "HTTP request attempts per host."),
+                                 ("errors", "Failed attempts per host (5xx, timeouts, connection errors)."),
+                                 ("throttled", "Attempts answered with 429 or 503 per host.")):
+            metric(f"host_{field}_total", "counter", help_text,
+                   [(f'{{host="{_label(host)}"}}', counters[field]) for host, counters in hosts])
+        metric("extract_pending", "gauge", "Downloaded videos waiting for or in frame extraction.",
+               [("", stats["extract_pending"])])
+        metric("videos_extracted_total", "counter", "Videos whose frames were extracted.",
+               [("", stats["videos_extracted"])])
+        metric("frames_total", "counter", "Extracted frames.", [("", stats["frames"])])
+        metric("loop_lag_seconds", "gauge", "Last measured event loop lag.", [("", stats["loop_lag"])])
+        metric("loop_lag_max_seconds", "gauge", "Largest measured event loop lag.", [("", stats["loop_lag_max"])])
+        return "\n".join(lines) + "\n"
+
+    def start_server(self, port: Optional[int] = None) -> int:
+        """Serve ``/metrics`` from a background thread and return the port (0 picks a free one)"""
+        if self._server is not None:
+            return self._server.server_address[1]
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.address, self.port if port is None else port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fil-metrics", daemon=True).start()
+        port = self._server.server_address[1]
+        logger.info(f"Serving metrics on http://{self.address}:{port}/metrics")
+        return port
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def log(self, previous: Optional[dict] = None) -> dict:
+        """Log the current stats, with rates since ``previous`` when given, and return them"""
+        stats = self.snapshot()
+        items = sum(stats["items"].values())
+        if previous is not None and stats["elapsed"] > previous["elapsed"]:
+            seconds = stats["elapsed"] - previous["elapsed"]
+            items_per_s = (items - sum(previous["items"].values())) / seconds
+            bytes_per_s = (stats["bytes"] - previous["bytes"]) / seconds
+        else:
+            items_per_s, bytes_per_s = stats["items_per_s"], stats["bytes_per_s"]
+        errors = sum(host["errors"] + host["throttled"] for host in stats["hosts"].values())
+        message = (f"{items} items ({items_per_s:.1f}/s, {bytes_per_s / 1e6:.2f} MB/s), "
+                   f"{stats['in_flight']} in flight, {stats['retries']} retries, {errors} errors")
+        if stats["extract_pending"] or stats["videos_extracted"]:
+            message += f", {stats['extract_pending']} videos waiting for extraction, {stats['frames']} frames"
+        if self.sample_loop_lag:
+            message += f", loop lag {stats['loop_lag'] * 1000:.0f} ms (max {stats['loop_lag_max'] * 1000:.0f} ms)"
+        logger.info(message)
+        return stats
+
+    async def _report(self) -> None:
+        previous = None
+        while True:
+            await asyncio.sleep(self.log_interval)
+            previous = self.log(previous)
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - start - self.lag_interval)
+            self.emit(LOOP_LAG, seconds=lag)
+            if lag > self.stall_threshold:
+                logger.warning(f"Event loop stalled for {lag:.2f} s")
+
+    @asynccontextmanager
+    async def monitoring(self):
+        """Run the periodic reporter, lag sampler and metrics server while the block runs.
+
+        Nested blocks share the tasks of the outermost one.
+        """
+        if self.port is not None:
+            self.start_server()
+        tasks = []
+        if not self._monitors:
+            if self.log_interval:
+                tasks.append(asyncio.ensure_future(self._report()))
+            if self.sample_loop_lag:
+                tasks.append(asyncio.ensure_future(self._sample_lag()))
+        self._monitors += 1
+        try:
+            yield self
+        finally:
+            self._monitors -= 1
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,10 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# spawn keeps children independent of the parent's threads and event loop
+SPAWN = multiprocessing.get_context("spawn")
+
+
+def spawn_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool of ``workers`` started with ``spawn``"""
+    return ProcessPoolExecutor(workers, mp_context=SPAWN)
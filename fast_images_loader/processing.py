@@ -0,0 +1,112 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from .formats import IMAGE_FORMATS
+from .pools import spawn_pool
+
+# Leading bytes of the image formats OpenCV decodes, with the extension used to re-encode them
+MAGIC_BYTES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".png"),
+    (b"GIF89a", ".png"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+)
+# Content types sent for images by servers that do not know better
+GENERIC_CONTENT_TYPES = ("application/octet-stream", "binary/octet-stream")
+
+
+class InvalidImage(ValueError):
+    """A downloaded body that is not a usable image"""
+
+
+def sniff_image(data: bytes) -> Optional[str]:
+    """Extension matching the magic bytes of ``data``, None for anything that is not a known image"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return ".webp"
+    for magic, extension in MAGIC_BYTES:
+        if data.startswith(magic):
+            return extension
+    return None
+
+
+class ImageProcessor:
+    """Validates and optionally shrinks downloaded images before they are stored.
+
+    Bodies are rejected with ``InvalidImage`` when the ``Content-Type`` is
+    not an image (with ``check_content_type``), when the magic bytes do not
+    match a known image format, or, with ``verify``, when the image does not
+    decode completely. Images with a side longer than ``max_side`` are
+    downscaled, and all images are re-encoded as ``image_format`` ("jpg",
+    "png" or "webp") with ``quality`` when one is given; otherwise the
+    original bytes are kept. Processing runs in a pool of ``workers``
+    threads (OpenCV releases the GIL), or processes with ``processes=True``.
+    """
+
+    def __init__(self, check_content_type: bool = True, verify: bool = True, max_side: Optional[int] = None,
+                 image_format: Optional[str] = None, quality: Optional[int] = None, workers: int = 4,
+                 processes: bool = False):
+        if image_format == "jpeg":
+            image_format = "jpg"
+        if image_format is not None and image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format {image_format!r}, expected one of {IMAGE_FORMATS}")
+        self.check_content_type = check_content_type
+        self.verify = verify
+        self.max_side = max_side
+        self.image_format = image_format
+        self.quality = quality
+        self.workers = workers
+        self.processes = processes
+
+    def executor(self) -> Executor:
+        if self.processes:
+            return spawn_pool(self.workers)
+        return ThreadPoolExecutor(self.workers, thread_name_prefix="fil-process")
+
+    def _encode_params(self, extension: str) -> list:
+        if self.quality is None:
+            return []
+        if extension == ".jpg":
+            return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        if extension == ".webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        return []
+
+    def process(self, data: bytes, content_type: Optional[str] = None) -> bytes:
+        """Return the bytes to store for a downloaded body or raise ``InvalidImage``"""
+        if self.check_content_type and content_type:
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            if not media_type.startswith("image/") and media_type not in GENERIC_CONTENT_TYPES:
+                raise InvalidImage(f"Content-Type {media_type} is not an image")
+        extension = sniff_image(data)
+        if extension is None:
+            raise InvalidImage("Body does not start with the magic bytes of a known image format")
+        if extension == ".jpg" and self.verify and not data.rstrip(b"\0").endswith(b"\xff\xd9"):
+            raise InvalidImage("Truncated JPEG")
+        if not self.verify and self.max_side is None and self.image_format is None:
+            return data
+
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise InvalidImage("Image does not decode")
+        resized = False
+        if self.max_side is not None and max(image.shape[:2]) > self.max_side:
+            scale = self.max_side / max(image.shape[:2])
+            size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+            resized = True
+        if not resized and self.image_format is None:
+            return data
+        if self.image_format is not None:
+            extension = "." + self.image_format
+        if extension == ".jpg" and image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        ok, encoded = cv2.imencode(extension, image, self._encode_params(extension))
+        if not ok:
+            raise InvalidImage(f"Could not encode image as {extension}")
+        return encoded.tobytes()
@@ -0,0 +1,132 @@
+from array import array
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+OK = 0
+FAILED = 1
+SKIPPED = 2
+NOT_MODIFIED = 3
+STATUS_NAMES = ("ok", "failed", "skipped", "not_modified")
+
+ItemResult = namedtuple(
+    "ItemResult",
+    ["status", "http_status", "bytes", "attempts", "error", "dns", "connect", "ttfb", "transfer", "total"],
+)
+ItemResult.__new__.__defaults__ = (0, 0, 0, None, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+LATENCY_FIELDS = ("dns", "connect", "ttfb", "transfer", "total")
+
+
+class RequestTimings:
+    """Mutable latency breakdown of one request, filled in by the Transport trace hooks"""
+
+    __slots__ = ("dns", "connect", "_dns_start", "_connect_start", "_dns_before_connect")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.dns = 0.0
+        self.connect = 0.0
+        self._dns_start = None
+        self._connect_start = None
+        self._dns_before_connect = 0.0
+
+
+class DownloadResults:
+    """Per-item results of a ``load_*`` call stored column-wise.
+
+    Every column is a compact ``array``, so millions of items cost a few tens
+    of bytes each instead of a dict per item. Error classes are interned and
+    stored as indices into ``error_classes``. Rows are kept in completion
+    order; ``index`` holds each item's position in the input. URLs and paths
+    are only kept for failed items.
+
+    With ``keep_rows=False`` only the counters and failed items are kept, so
+    memory stays flat for arbitrarily long streaming jobs.
+    """
+
+    def __init__(self, keep_rows: bool = True):
+        self.keep_rows = keep_rows
+        self.counts = [0] * len(STATUS_NAMES)
+        self.total_bytes = 0
+        self.failed_items: List[Tuple[int, str, str]] = []
+        self.index = array("q")
+        self.status = array("b")
+        self.http_status = array("h")
+        self.bytes = array("q")
+        self.attempts = array("H")
+        self.error = array("h")
+        self.error_classes: List[str] = []
+        self._error_ids: Dict[str, int] = {}
+        for name in LATENCY_FIELDS:
+            setattr(self, name, array("f"))
+
+    def __len__(self) -> int:
+        return sum(self.counts)
+
+    def _error_id(self, error: Optional[str]) -> int:
+        if error is None:
+            return -1
+        if error not in self._error_ids:
+            self._error_ids[error] = len(self.error_classes)
+            self.error_classes.append(error)
+        return self._error_ids[error]
+
+    def append(self, index: int, url: str, path: str, result: ItemResult) -> None:
+        self.counts[result.status] += 1
+        self.total_bytes += result.bytes
+        if result.status == FAILED:
+            self.failed_items.append((index, url, path))
+        if not self.keep_rows:
+            return
+        self.index.append(index)
+        self.status.append(result.status)
+        self.http_status.append(result.http_status)
+        self.bytes.append(result.bytes)
+        self.attempts.append(min(result.attempts, 0xFFFF))
+        self.error.append(self._error_id(result.error))
+        for name in LATENCY_FIELDS:
+            getattr(self, name).append(getattr(result, name))
+
+    def extend(self, other: "DownloadResults", map_index: Optional[Callable[[int], int]] = None) -> None:
+        """Merge rows of ``other``, optionally translating their input positions"""
+        map_index = map_index or (lambda index: index)
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.total_bytes += other.total_bytes
+        self.failed_items.extend((map_index(index), url, path) for index, url, path in other.failed_items)
+        if not self.keep_rows:
+            return
+        self.index.extend(array("q", map(map_index, other.index)))
+        self.status.extend(other.status)
+        self.http_status.extend(other.http_status)
+        self.bytes.extend(other.bytes)
+        self.attempts.extend(other.attempts)
+        self.error.extend(array("h", (self._error_id(other.error_classes[e]) if e >= 0 else -1
+                                      for e in other.error)))
+        for name in LATENCY_FIELDS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def __getitem__(self, row: int) -> ItemResult:
+        error = self.error[row]
+        return ItemResult(self.status[row], self.http_status[row], self.bytes[row], self.attempts[row],
+                          self.error_classes[error] if error >= 0 else None,
+                          *(getattr(self, name)[row] for name in LATENCY_FIELDS))
+
+    def failed(self) -> List[Tuple[str, str]]:
+        """The ``(url, path)`` pairs that could not be downloaded"""
+        return [(url, path) for _, url, path in self.failed_items]
+
+    def columns(self) -> Dict[str, array]:
+        """Numeric columns, e.g. for ``numpy.frombuffer`` or a DataFrame"""
+        return {name: getattr(self, name) for name in
+                ("index", "status", "http_status", "bytes", "attempts", "error") + LATENCY_FIELDS}
+
+    def summary(self) -> dict:
+        latencies = sorted(total for total, status in zip(self.total, self.status) if status == OK)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0
+
+        return dict(zip(STATUS_NAMES, self.counts), bytes=self.total_bytes,
+                    p50=percentile(0.5), p99=percentile(0.99))
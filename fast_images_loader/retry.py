@@ -0,0 +1,148 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, FrozenSet, Optional
+
+import aiohttp
+from loguru import logger
+
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# How often requests to a half-open host check whether its probe finished
+PROBE_POLL_INTERVAL = 0.1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a ``Retry-After`` header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Decides whether and when a failed download is retried.
+
+    Only transient failures are retried: connection errors, timeouts,
+    truncated bodies and the HTTP statuses in ``retry_statuses``. Retries are
+    delayed with exponential backoff and full jitter, and ``Retry-After``
+    headers are honored up to ``max_retry_after`` seconds. ``retry_budget``
+    caps the total number of retries for as long as the policy is used, and a
+    per-host circuit breaker pauses requests to a host for
+    ``breaker_cooldown`` seconds after ``breaker_threshold`` consecutive
+    transient failures. After the cooldown a single probe request goes
+    through; its success resumes the host, its failure pauses it again.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 jitter: bool = True, retry_statuses: FrozenSet[int] = TRANSIENT_STATUSES,
+                 respect_retry_after: bool = True, max_retry_after: float = 120.0,
+                 retry_budget: Optional[int] = None, breaker_threshold: Optional[int] = None,
+                 breaker_cooldown: float = 30.0):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_statuses = retry_statuses
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.retry_budget = retry_budget
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.retries_spent = 0
+        self._consecutive_failures: Dict[str, int] = defaultdict(int)
+        self._paused_until: Dict[str, float] = {}
+        # Start time of the probe request of a half-open host
+        self._probing: Dict[str, float] = {}
+
+    def is_transient_status(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    @staticmethod
+    def is_transient_error(error: BaseException) -> bool:
+        if isinstance(error, (aiohttp.InvalidURL, aiohttp.ClientSSLError, aiohttp.TooManyRedirects)):
+            return False
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError,
+                                  aiohttp.ClientPayloadError, ConnectionError))
+
+    def can_retry(self, attempts: int) -> bool:
+        """Reserve a retry after ``attempts`` attempts if attempts and the global budget allow it"""
+        if attempts >= self.max_attempts:
+            return False
+        if self.retry_budget is not None and self.retries_spent >= self.retry_budget:
+            logger.warning("Retry budget exhausted, failing without retry")
+            return False
+        self.retries_spent += 1
+        return True
+
+    def delay(self, attempts: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before the next attempt"""
+        server_delay = parse_retry_after(retry_after) if self.respect_retry_after else None
+        if server_delay is not None:
+            return min(server_delay, self.max_retry_after)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def host_delay(self, host: str) -> float:
+        """Seconds until a request to ``host`` may start, 0 if it may start now (see ``admit``)"""
+        paused_until = self._paused_until.get(host)
+        if paused_until is None:
+            return 0.0
+        now = time.monotonic()
+        if paused_until > now:
+            return paused_until - now
+        # Half-open: wait for the running probe, or start another one if it never reported back
+        probe_started = self._probing.get(host)
+        if probe_started is not None and now - probe_started < self.breaker_cooldown:
+            return PROBE_POLL_INTERVAL
+        return 0.0
+
+    def admit(self, host: str) -> None:
+        """Record that a request to ``host`` starts; after a cooldown it is the probe of the host"""
+        if host in self._paused_until:
+            self._probing[host] = time.monotonic()
+
+    async def wait_for_host(self, host: str) -> None:
+        """Sleep while the circuit breaker of ``host`` is open or its probe is running"""
+        while True:
+            delay = self.host_delay(host)
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+        self.admit(host)
+
+    def record_success(self, host: str) -> None:
+        self._consecutive_failures.pop(host, None)
+        self._close(host)
+
+    def record_neutral(self, host: str) -> None:
+        """The host answered, e.g. with a 404; that says nothing about failures but ends a probe"""
+        self._close(host)
+
+    def _close(self, host: str) -> None:
+        if self._probing.pop(host, None) is not None:
+            logger.info(f"Resuming requests to {host}")
+        self._paused_until.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        if self._probing.pop(host, None) is not None:
+            logger.warning(f"Probe request to {host} failed, pausing requests for another {self.breaker_cooldown}s")
+            self._paused_until[host] = time.monotonic() + self.breaker_cooldown
+            return
+        self._consecutive_failures[host] += 1
+        if self.breaker_threshold is not None and self._consecutive_failures[host] >= self.breaker_threshold:
+            logger.warning(f"Pausing requests to {host} for {self.breaker_cooldown}s after "
+                           f"{self._consecutive_failures[host]} consecutive failures")
+            self._paused_until[host] = time.monotonic() + self.breaker_cooldown
+            self._consecutive_failures[host] = 0
@@ -0,0 +1,70 @@
+from typing import Iterable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = 32
+SampledFrame = Tuple[int, float, np.ndarray]
+
+
+def thumbnail(frame: np.ndarray, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """Small grayscale ``float32`` copy of a frame used by the selection metrics"""
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def scene_difference(previous: np.ndarray, current: np.ndarray) -> float:
+    """Mean absolute difference of two thumbnails, from 0 (identical) to 1"""
+    return float(np.mean(np.abs(current - previous))) / 255.0
+
+
+def phash(thumb: np.ndarray) -> np.ndarray:
+    """64-bit perceptual hash: signs of the lowest 8x8 DCT coefficients against their median"""
+    low = cv2.dct(thumb)[:8, :8]
+    return (low > np.median(low)).ravel()
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.count_nonzero(a != b))
+
+
+class FrameSampler:
+    """Selects which of the frames sampled at the frame rate are kept.
+
+    A frame is kept when it differs from the last kept frame by more than
+    ``scene_threshold`` (mean absolute difference of small grayscale
+    thumbnails, 0-1) and its perceptual hash is more than
+    ``dedup_distance`` bits away from the last kept frame's hash. At most
+    ``max_frames`` frames are kept per extraction job, i.e. per video unless
+    it is split into segments; decoding stops once the cap is reached. The
+    first frame is always kept. The sampler only holds settings, the state
+    lives in each ``select`` call.
+    """
+
+    def __init__(self, scene_threshold: Optional[float] = None, dedup_distance: Optional[int] = None,
+                 max_frames: Optional[int] = None):
+        self.scene_threshold = scene_threshold
+        self.dedup_distance = dedup_distance
+        self.max_frames = max_frames
+
+    def select(self, frames: Iterable[SampledFrame]) -> Iterator[SampledFrame]:
+        """Filter ``(number, timestamp, frame)`` items"""
+        compare = self.scene_threshold is not None or self.dedup_distance is not None
+        last_thumb = last_hash = None
+        kept = 0
+        for item in frames:
+            if self.max_frames is not None and kept >= self.max_frames:
+                return
+            if compare:
+                thumb = thumbnail(item[2])
+                frame_hash = phash(thumb) if self.dedup_distance is not None else None
+                if last_thumb is not None:
+                    if self.scene_threshold is not None and \
+                            scene_difference(last_thumb, thumb) <= self.scene_threshold:
+                        continue
+                    if frame_hash is not None and hamming(last_hash, frame_hash) <= self.dedup_distance:
+                        continue
+                last_thumb, last_hash = thumb, frame_hash
+            kept += 1
+            yield item
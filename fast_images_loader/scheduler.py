@@ -0,0 +1,182 @@
+import asyncio
+from collections import defaultdict, deque
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Deque, Iterable, Optional, Union
+from urllib.parse import urlsplit
+
+
+def url_host(url: str) -> str:
+    """Return the host part of a URL used as the per-host concurrency key"""
+    return urlsplit(url).netloc.lower()
+
+
+async def as_async_iterator(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    """Iterate sync and async iterables alike"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class SlidingWindowScheduler:
+    """Keeps ``max_in_flight`` downloads running at all times.
+
+    Unlike fixed batches, a new download is started as soon as any running one
+    finishes, so a single slow URL never stalls the rest of the pipe. When
+    ``per_host_limit`` is set, items for a saturated host are parked and
+    started as soon as a slot for that host frees up, while other hosts keep
+    using the window. A ``host_limiter`` (see ``HostLimiter``) makes the
+    per-host limit adaptive; ``per_host_limit`` then acts as an upper bound.
+    Items of a host whose request rate is exhausted, or whose circuit
+    breaker is open (see ``RetryPolicy``), are parked as well and started
+    once the host's token bucket refills or its cooldown ends, instead of
+    waiting inside a window slot.
+    """
+
+    def __init__(self, max_in_flight: int = 10, per_host_limit: Optional[int] = None,
+                 max_parked: Optional[int] = None, host_limiter=None, retry_policy=None):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if per_host_limit is not None and per_host_limit < 1:
+            raise ValueError("per_host_limit must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.max_parked = max_parked if max_parked is not None else max_in_flight * 100
+        self.host_limiter = host_limiter
+        self.retry_policy = retry_policy
+
+    def _host_limit(self, host: str) -> Optional[int]:
+        if self.host_limiter is None:
+            return self.per_host_limit
+        limit = self.host_limiter.limit(host)
+        if limit is None or self.per_host_limit is None:
+            return self.per_host_limit if limit is None else limit
+        return min(limit, self.per_host_limit)
+
+    def _host_delay(self, host: str) -> float:
+        """Seconds until ``host`` may start another request; 0 admits one request right away"""
+        if self.retry_policy is not None:
+            delay = self.retry_policy.host_delay(host)
+            if delay:
+                return delay
+        if self.host_limiter is not None:
+            delay = self.host_limiter.try_acquire(host)
+            if delay:
+                return delay
+        if self.retry_policy is not None:
+            self.retry_policy.admit(host)
+        return 0.0
+
+    async def run(self, items: Union[Iterable[tuple], AsyncIterable[tuple]], handler: Callable[..., Awaitable],
+                  progress=None) -> None:
+        """Run ``handler(*item)`` for every item in ``items``; the first field of an item is its URL.
+
+        Items are pulled lazily, only when a window slot is free, so ``items``
+        may be a generator or async iterator over more items than fit in memory.
+        """
+        loop = asyncio.get_running_loop()
+        free_slots = self.max_in_flight
+        slot_freed = asyncio.Event()
+        active: Dict[str, int] = defaultdict(int)
+        parked: Dict[str, Deque[tuple]] = defaultdict(deque)
+        parked_count = 0
+        unparked = asyncio.Event()
+        # Hosts waiting for their delay to pass, and hosts whose delay passed while the window was full
+        timers: Dict[str, asyncio.TimerHandle] = {}
+        ready: Deque[str] = deque()
+        woken = asyncio.Event()
+        tasks = set()
+        errors = []
+
+        def has_capacity(host):
+            limit = self._host_limit(host)
+            return limit is None or active[host] < limit
+
+        def start(host, item):
+            active[host] += 1
+            task = asyncio.ensure_future(run_one(host, item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        def admit(host) -> bool:
+            """Take the host's admission, or schedule a wake-up for when it may start again"""
+            delay = self._host_delay(host)
+            if not delay:
+                return True
+            if host not in timers:
+                timers[host] = loop.call_later(delay, wake, host)
+            return False
+
+        def wake(host):
+            del timers[host]
+            if parked[host]:
+                ready.append(host)
+            drain_ready()
+            woken.set()
+
+        def drain(host):
+            nonlocal free_slots, parked_count
+            while parked[host] and not errors and free_slots > 0 and has_capacity(host) and admit(host):
+                free_slots -= 1
+                parked_count -= 1
+                unparked.set()
+                start(host, parked[host].popleft())
+
+        def drain_ready():
+            while ready and free_slots > 0:
+                drain(ready.popleft())
+
+        async def run_one(host, item):
+            nonlocal free_slots
+            try:
+                await handler(*item)
+            except Exception as e:
+                errors.append(e)
+                # Wake the main loop wherever it waits, so that it stops pulling items
+                unparked.set()
+                slot_freed.set()
+            finally:
+                active[host] -= 1
+                free_slots += 1
+                if progress is not None:
+                    progress.update(1)
+                # Parked items of this host go first; an adaptive limit may also have grown
+                drain(host)
+                drain_ready()
+                if free_slots > 0:
+                    slot_freed.set()
+
+        try:
+            async for item in as_async_iterator(items):
+                if errors:
+                    break
+                while parked_count >= self.max_parked and not errors:
+                    unparked.clear()
+                    await unparked.wait()
+                while free_slots == 0 and not errors:
+                    slot_freed.clear()
+                    await slot_freed.wait()
+                if errors:
+                    break
+                host = url_host(item[0])
+                # Later items of a host queue up behind its parked ones
+                if parked[host] or not has_capacity(host) or not admit(host):
+                    parked[host].append(item)
+                    parked_count += 1
+                    continue
+                free_slots -= 1
+                start(host, item)
+
+            while tasks or (parked_count and not errors):
+                if tasks:
+                    await asyncio.gather(*list(tasks))
+                else:
+                    woken.clear()
+                    await woken.wait()
+        finally:
+            for timer in timers.values():
+                timer.cancel()
+
+        if errors:
+            raise errors[0]
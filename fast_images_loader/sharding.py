@@ -0,0 +1,125 @@
+import asyncio
+import os
+import queue
+import time
+from concurrent.futures import wait
+from itertools import islice
+from typing import Iterable, Optional, Tuple
+
+from loguru import logger
+from tqdm import tqdm
+
+from .inputs import PairSource
+from .manifest import JobManifest
+from .pools import SPAWN, spawn_pool
+from .results import DownloadResults
+
+
+class _QueueProgress:
+    """Progress bar stand-in that forwards a shard's progress to the parent process"""
+
+    def __init__(self, progress_queue, interval: float = 0.2):
+        self.progress_queue = progress_queue
+        self.interval = interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def update(self, n: int = 1) -> None:
+        self._pending += n
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self.progress_queue.put(self._pending)
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+def _run_shard(config: dict, media: str, pairs, shard: int, workers: int, data_folder: str,
+               progress_queue) -> DownloadResults:
+    from .loader import FastImagesLoader
+
+    if isinstance(pairs, PairSource):
+        # Every worker reads the source and keeps only its own share
+        pairs = islice(pairs, shard, None, workers)
+    sink = config.get("sink")
+    if sink is not None:
+        # Every worker writes its own shards
+        config = dict(config, sink=sink.for_worker(shard))
+    manifest = config.get("manifest")
+    if manifest:
+        # All workers write one database; committing every update keeps each write lock short,
+        # so no worker waits on another one's batched transaction
+        if isinstance(manifest, JobManifest):
+            manifest = manifest.path
+        elif manifest is True:
+            manifest = os.path.join(data_folder, JobManifest.DEFAULT_NAME)
+        config = dict(config, manifest=JobManifest(manifest, commit_every=1))
+    loader = FastImagesLoader(**config)
+    loader._progress = lambda total, desc: _QueueProgress(progress_queue)
+    try:
+        return asyncio.run(loader.load_pairs_to_folder_async(pairs, data_folder, media))
+    finally:
+        if loader.sink is not None:
+            loader.sink.close()
+        if loader.manifest:
+            loader.manifest.close()
+
+
+def load_sharded(config: dict, media: str, pairs: Iterable[Tuple[str, str]], data_folder: str,
+                 workers: Optional[int] = None) -> DownloadResults:
+    """Partition the items across ``workers`` processes, each with its own event loop and session.
+
+    Items are dealt round-robin: worker ``k`` gets items ``k``, ``k + workers``
+    and so on. Progress of all shards is aggregated into one bar in the parent
+    process. Returns the merged results of all shards.
+    """
+    workers = workers or os.cpu_count() or 1
+    if isinstance(pairs, PairSource) and pairs.source == "-":
+        logger.warning("stdin cannot be shared between worker processes, reading it into memory first")
+        pairs = list(pairs)
+    if isinstance(pairs, PairSource):
+        total = None
+    else:
+        pairs = list(pairs)
+        total = len(pairs)
+        workers = min(workers, total)
+        if not pairs:
+            return DownloadResults(keep_rows=config.get("keep_results", True))
+    os.makedirs(data_folder, exist_ok=True)
+    logger.info(f"Loading {total if total is not None else 'streamed'} {media}s with {workers} worker processes")
+    results = DownloadResults(keep_rows=config.get("keep_results", True))
+    with SPAWN.Manager() as manager, \
+            spawn_pool(workers) as pool, \
+            tqdm(total=total, desc=f"Downloading {media}s") as progress:
+        progress_queue = manager.Queue()
+        futures = [
+            pool.submit(_run_shard, config, media,
+                        pairs if isinstance(pairs, PairSource) else pairs[shard::workers],
+                        shard, workers, data_folder, progress_queue)
+            for shard in range(workers)
+        ]
+        pending = set(futures)
+        while True:
+            try:
+                while True:
+                    progress.update(progress_queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not pending:
+                break
+            _, pending = wait(pending, timeout=0.2)
+        for shard, future in enumerate(futures):
+            # Shard ``shard`` holds every ``workers``-th item starting at ``shard``
+            results.extend(future.result(), lambda index, shard=shard: shard + index * workers)
+    failed = results.summary()["failed"]
+    if failed:
+        logger.warning(f"{failed} of {len(results)} downloads failed across {workers} workers")
+    return results
@@ -0,0 +1,183 @@
+import glob
+import json
+import os
+import re
+import tarfile
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from loguru import logger
+
+COPY_BLOCK = 1024 * 1024
+
+
+class ShardEntry(NamedTuple):
+    """Location of a member's data inside a shard"""
+    shard: str
+    offset: int
+    size: int
+
+
+class ShardWriter:
+    """Packs files into size-bounded tar shards written strictly sequentially.
+
+    Members are appended to ``<prefix>-000000.tar``, ``<prefix>-000001.tar``
+    and so on in ``folder``; a shard is closed once it would grow beyond
+    ``max_bytes`` or hold ``max_count`` members. Next to every shard a
+    ``.idx`` file lists each member's name, data offset and size as JSON
+    lines, so ``ShardReader`` can read single members without scanning the
+    archive. Member names are paths relative to ``root``. Writes are
+    thread-safe; shards are complete once ``close()`` is called, and members
+    added before ``sync()`` survive a crash. New shards never overwrite
+    existing ones, so resumed jobs add shards.
+    """
+
+    def __init__(self, folder: str, prefix: str = "shard", max_bytes: int = 1024 ** 3, max_count: Optional[int] = None,
+                 root: Optional[str] = None):
+        self.folder = folder
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_count = max_count
+        self.root = root
+        self.shard_paths: List[str] = []
+        self._lock = threading.Lock()
+        self._tar = None
+        self._index = None
+        self._number = None
+        self._bytes = 0
+        self._count = 0
+
+    def __reduce__(self):
+        # Worker processes get an unopened writer with the same settings, see for_worker()
+        return self.__class__, (self.folder, self.prefix, self.max_bytes, self.max_count, self.root)
+
+    def for_worker(self, worker: int) -> "ShardWriter":
+        """Writer for one of several processes; each process writes its own shards"""
+        return self.__class__(self.folder, f"{self.prefix}-w{worker:03d}", self.max_bytes, self.max_count, self.root)
+
+    def member_name(self, path: str) -> str:
+        """Archive name of ``path``: relative to ``root``, or the path without its leading separator"""
+        path = os.path.abspath(path)
+        if self.root is not None:
+            relative = os.path.relpath(path, os.path.abspath(self.root))
+            if not relative.startswith(os.pardir):
+                path = relative
+        return path.replace(os.sep, "/").lstrip("/")
+
+    def _next_number(self) -> int:
+        pattern = re.compile(rf"{re.escape(self.prefix)}-(\d{{6}})\.tar$")
+        numbers = [int(match.group(1)) for match in map(pattern.match, os.listdir(self.folder)) if match]
+        return max(numbers) + 1 if numbers else 0
+
+    def _open_shard(self) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        self._number = self._next_number() if self._number is None else self._number + 1
+        path = os.path.join(self.folder, f"{self.prefix}-{self._number:06d}.tar")
+        self._tar = open(path, "xb")
+        self._index = open(path[:-len(".tar")] + ".idx", "w", encoding="utf-8")
+        self._bytes = 0
+        self._count = 0
+        self.shard_paths.append(path)
+
+    def _sync_shard(self) -> None:
+        # Data first, so that a durable index line never points at missing data
+        for f in (self._tar, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _close_shard(self) -> None:
+        # Two zero blocks mark the end of a tar archive
+        self._tar.write(b"\0" * (2 * tarfile.BLOCKSIZE))
+        self._sync_shard()
+        self._tar.close()
+        self._index.close()
+        logger.debug(f"Closed shard {self.shard_paths[-1]} with {self._count} members")
+        self._tar = self._index = None
+
+    def _write_member(self, name: str, size: int, write_data) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        header = info.tobuf(tarfile.DEFAULT_FORMAT, "utf-8", "surrogateescape")
+        with self._lock:
+            if self._tar is not None and self._count and (
+                    self._bytes + len(header) + size > self.max_bytes
+                    or (self.max_count is not None and self._count >= self.max_count)):
+                self._close_shard()
+            if self._tar is None:
+                self._open_shard()
+            self._tar.write(header)
+            offset = self._bytes + len(header)
+            write_data(self._tar)
+            padding = -size % tarfile.BLOCKSIZE
+            if padding:
+                self._tar.write(b"\0" * padding)
+            self._bytes = offset + size + padding
+            self._count += 1
+            self._index.write(json.dumps({"name": name, "offset": offset, "size": size}) + "\n")
+
+    def add(self, name: str, data: bytes) -> None:
+        """Append an in-memory member"""
+        self._write_member(name, len(data), lambda f: f.write(data))
+
+    def add_file(self, name: str, path: str, remove: bool = False) -> None:
+        """Append a file's content as a member, deleting the file afterwards with ``remove``"""
+        def copy(f):
+            with open(path, "rb") as src:
+                for block in iter(lambda: src.read(COPY_BLOCK), b""):
+                    f.write(block)
+
+        self._write_member(name, os.path.getsize(path), copy)
+        if remove:
+            os.remove(path)
+
+    def sync(self) -> None:
+        """Write all members added so far to disk, without closing the shard"""
+        with self._lock:
+            if self._tar is not None:
+                self._sync_shard()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._tar is not None:
+                self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ShardReader:
+    """Random access to the members of the shards written by ``ShardWriter``"""
+
+    def __init__(self, folder: str, prefix: str = "shard"):
+        self.folder = folder
+        self.entries: Dict[str, ShardEntry] = {}
+        for index_path in sorted(glob.glob(os.path.join(glob.escape(folder), f"{glob.escape(prefix)}-*.idx"))):
+            shard = os.path.basename(index_path)[:-len(".idx")] + ".tar"
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # Cut off by a crash before the shard was synced
+                        break
+                    row = json.loads(line)
+                    self.entries[row["name"]] = ShardEntry(shard, row["offset"], row["size"])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def read(self, name: str) -> bytes:
+        entry = self.entries[name]
+        with open(os.path.join(self.folder, entry.shard), "rb") as f:
+            f.seek(entry.offset)
+            return f.read(entry.size)
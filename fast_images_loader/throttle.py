@@ -0,0 +1,86 @@
+import asyncio
+import os
+import shutil
+import time
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+
+class FileTooLarge(ValueError):
+    """A download larger than the configured maximum file size"""
+
+
+class BandwidthLimiter:
+    """Token bucket over bytes shared by all downloads that use it.
+
+    Every received chunk takes its size in tokens; the bucket refills at
+    ``rate`` bytes per second up to ``burst`` bytes (one second's worth by
+    default). A chunk that finds the bucket empty waits until its bytes are
+    paid off, so the combined throughput of all downloads stays at ``rate``.
+    Pass the same limiter to several loaders for a global cap.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+
+    async def consume(self, size: int) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        # Going into debt keeps later chunks waiting behind earlier ones
+        self._tokens -= size
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class DiskWatermark:
+    """Pauses new downloads while the free space of the target disk is below ``min_free_bytes``.
+
+    Free space is checked at most every ``check_interval`` seconds per
+    folder; while it is too low, downloads about to start poll every
+    ``poll_interval`` seconds until space recovers. Running downloads are
+    not interrupted.
+    """
+
+    def __init__(self, min_free_bytes: int, check_interval: float = 1.0, poll_interval: float = 5.0):
+        self.min_free_bytes = min_free_bytes
+        self.check_interval = check_interval
+        self.poll_interval = poll_interval
+        self.paused = False
+        self._checked: Dict[str, Tuple[float, int]] = {}
+
+    @staticmethod
+    def _existing_folder(path: str) -> str:
+        folder = os.path.dirname(os.path.abspath(path))
+        while not os.path.isdir(folder) and os.path.dirname(folder) != folder:
+            folder = os.path.dirname(folder)
+        return folder
+
+    def free_bytes(self, path: str) -> int:
+        """Free bytes on the disk ``path`` is written to, cached for ``check_interval`` seconds"""
+        folder = self._existing_folder(path)
+        now = time.monotonic()
+        checked = self._checked.get(folder)
+        if checked is None or now - checked[0] >= self.check_interval:
+            checked = self._checked[folder] = (now, shutil.disk_usage(folder).free)
+        return checked[1]
+
+    async def wait(self, path: str) -> None:
+        """Return once there is enough free space to start writing ``path``"""
+        if self.free_bytes(path) >= self.min_free_bytes:
+            return
+        if not self.paused:
+            self.paused = True
+            logger.warning(f"Less than {self.min_free_bytes / 1024 / 1024:.0f} MB free on the disk of {path}, "
+                           f"pausing new downloads")
+        while self.free_bytes(path) < self.min_free_bytes:
+            await asyncio.sleep(self.poll_interval)
+        if self.paused:
+            self.paused = False
+            logger.info("Free disk space recovered, resuming downloads")
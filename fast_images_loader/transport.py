@@ -0,0 +1,102 @@
+from time import perf_counter
+from typing import Dict, Optional
+
+import aiohttp
+from loguru import logger
+
+from .results import RequestTimings
+
+
+def timing_trace_config() -> aiohttp.TraceConfig:
+    """Trace hooks recording DNS and connect durations into a ``RequestTimings`` request context"""
+    trace_config = aiohttp.TraceConfig()
+
+    def timings_of(context) -> Optional[RequestTimings]:
+        timings = context.trace_request_ctx
+        return timings if isinstance(timings, RequestTimings) else None
+
+    async def on_dns_start(session, context, params):
+        timings = timings_of(context)
+        if timings is not None:
+            timings._dns_start = perf_counter()
+
+    async def on_dns_end(session, context, params):
+        timings = timings_of(context)
+        if timings is not None and timings._dns_start is not None:
+            timings.dns += perf_counter() - timings._dns_start
+
+    async def on_connect_start(session, context, params):
+        timings = timings_of(context)
+        if timings is not None:
+            timings._connect_start = perf_counter()
+            timings._dns_before_connect = timings.dns
+
+    async def on_connect_end(session, context, params):
+        timings = timings_of(context)
+        if timings is not None and timings._connect_start is not None:
+            # Connection setup includes name resolution, which is reported separately
+            dns = timings.dns - timings._dns_before_connect
+            timings.connect += perf_counter() - timings._connect_start - dns
+
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    return trace_config
+
+
+class Transport:
+    """Connection pool, DNS cache and timeout settings for the aiohttp session.
+
+    A single ``Transport`` can be shared by several loaders; every session it
+    creates uses the same tuned connector settings. Keep-alive connections are
+    reused between requests to the same host, so TLS handshakes are only paid
+    once per connection instead of once per download.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 0,
+                 keepalive_timeout: float = 30.0, use_dns_cache: bool = True,
+                 ttl_dns_cache: Optional[int] = 300, use_aiodns: bool = False,
+                 connect_timeout: Optional[float] = 5.0,
+                 read_timeout: Optional[float] = 30.0, total_timeout: Optional[float] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.use_dns_cache = use_dns_cache
+        self.ttl_dns_cache = ttl_dns_cache
+        self.use_aiodns = use_aiodns
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.headers = headers
+
+    def timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout,
+                                     sock_read=self.read_timeout)
+
+    def _resolver(self):
+        if not self.use_aiodns:
+            return None
+        try:
+            import aiodns  # noqa: F401
+        except ImportError:
+            logger.warning("aiodns is not installed, falling back to the default resolver")
+            return None
+        return aiohttp.AsyncResolver()
+
+    def create_connector(self) -> aiohttp.TCPConnector:
+        """Create a connector; must be called from inside a running event loop"""
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=self.use_dns_cache,
+            ttl_dns_cache=self.ttl_dns_cache,
+            resolver=self._resolver(),
+        )
+
+    def create_session(self) -> aiohttp.ClientSession:
+        """Create a session; must be called from inside a running event loop"""
+        return aiohttp.ClientSession(connector=self.create_connector(), timeout=self.timeout(),
+                                     headers=self.headers, trace_configs=[timing_trace_config()])
@@ -14,13 +14,14 @@ setup(
         "Documentation": "https://github.com/vaskers5/fast_images_loader#readme",
         "Source Code": "https://github.com/vaskers5/fast_images_loader",
     },
-    packages=find_packages(),
+    packages=find_packages(exclude=("benchmarks",)),
     install_requires=[
         "aiohttp",
         "tqdm",
         "loguru",
         "nest_asyncio",
         "opencv-python",
+        "numpy",
         "aiofiles",
     ],
     entry_points={
@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+from benchmarks.run import _peak_rss, compare
+from benchmarks.server import make_app, synthetic_image
+
+
+@pytest.mark.asyncio
+async def test_server_failure_rates():
+    image = synthetic_image(64, 48)
+    server = TestServer(make_app(image, b"video", error_rate=0.2, throttle_rate=0.2))
+    await server.start_server()
+    try:
+        statuses = []
+        async with ClientSession() as session:
+            for i in range(200):
+                async with session.get(server.make_url(f"/image/{i}.jpg")) as response:
+                    statuses.append(response.status)
+                    if response.status == 200:
+                        assert await response.read() == image
+            async with session.get(server.make_url("/stats")) as response:
+                stats = await response.json()
+    finally:
+        await server.close()
+
+    assert stats == {"requests": 200, "errors": statuses.count(500), "throttled": statuses.count(429)}
+    assert 20 < stats["errors"] < 60
+    assert 20 < stats["throttled"] < 60
+
+
+def test_compare(tmp_path):
+    def report(path, photos, frames):
+        results = [dict(scenario="photos", concurrency=16, items_per_s=photos, peak_rss_mb=80),
+                   dict(scenario="frames", mode="grab", workers=4, frames_per_s=frames, peak_rss_mb=90)]
+        path.write_text(json.dumps({"results": results}))
+        return str(path)
+
+    lines = compare(report(tmp_path / "before.json", 100, 50), report(tmp_path / "after.json", 150, 50))
+
+    assert lines == ["photos 16: 100.0 -> 150.0 items_per_s (+50.0%), peak RSS 80 -> 80 MB",
+                     "frames grab 4: 50.0 -> 50.0 frames_per_s (+0.0%), peak RSS 90 -> 90 MB"]
+
+
+def test_peak_rss_includes_exited_children():
+    subprocess.run([sys.executable, "-c", "buffer = b'x' * 400_000_000"], check=True)
+    assert _peak_rss() >= 400_000_000
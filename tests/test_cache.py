@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader import cache as cache_module
+from fast_images_loader.cache import HttpCache
+from fast_images_loader.loader import FastImagesLoader
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests_and_dedup(tmp_path):
+    statuses = []
+
+    async def image(request):
+        if request.headers.get("If-None-Match") == '"same"':
+            statuses.append(304)
+            return web.Response(status=304)
+        statuses.append(200)
+        return web.Response(body=b"identical image", headers={"ETag": '"same"'})
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    cache = HttpCache(str(tmp_path / "cache"))
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/a.jpg")), str(server.make_url("/b.jpg"))]
+        first = [str(tmp_path / "day1" / "a.jpg"), str(tmp_path / "day1" / "b.jpg")]
+        second = [str(tmp_path / "day2" / "a.jpg"), str(tmp_path / "day2" / "b.jpg")]
+        loader = FastImagesLoader(cache=cache)
+        await loader.load_photos_to_folder_async(urls, first, str(tmp_path / "day1"))
+        await loader.load_photos_to_folder_async(urls, second, str(tmp_path / "day2"))
+
+    assert statuses == [200, 200, 304, 304]
+    inodes = {os.stat(path).st_ino for path in first + second}
+    assert len(inodes) == 1
+    for path in first + second:
+        with open(path, "rb") as f:
+            assert f.read() == b"identical image"
+    cache.close()
+
+
+def test_lru_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache"), max_bytes=10)
+    for name in ("a", "b", "c"):
+        tmp_file = tmp_path / f"{name}.part"
+        tmp_file.write_bytes(name.encode() * 5)
+        cache.store(f"https://example.com/{name}", str(tmp_file), str(tmp_path / name), name * 64, 5, etag=name)
+
+    assert not os.path.exists(cache.blob_path("a" * 64))
+    assert os.path.exists(cache.blob_path("c" * 64))
+    assert cache.lookup("https://example.com/a") == ({}, None)
+    assert cache.lookup("https://example.com/c")[1] == "c" * 64
+    # Outputs stay intact even after their blob was evicted
+    assert (tmp_path / "a").read_bytes() == b"aaaaa"
+    cache.close()
+
+
+def test_size_cap_holds_across_instances(tmp_path):
+    # Two instances on one root stand in for two worker processes
+    caches = [HttpCache(str(tmp_path / "cache"), max_bytes=10) for _ in range(2)]
+    for cache, name in zip(caches + caches[:1], ("a", "b", "c")):
+        tmp_file = tmp_path / f"{name}.part"
+        tmp_file.write_bytes(name.encode() * 5)
+        cache.store(f"https://example.com/{name}", str(tmp_file), str(tmp_path / name), name * 64, 5, etag=name)
+
+    assert not os.path.exists(caches[0].blob_path("a" * 64))
+    assert caches[1].total_bytes() == 10
+    for cache in caches:
+        cache.close()
+
+
+def test_lookup_does_not_wait_for_a_slow_copy(tmp_path, monkeypatch):
+    cache = HttpCache(str(tmp_path / "cache"))
+    link_or_copy = cache_module.link_or_copy
+
+    def slow_link_or_copy(src, dst):
+        time.sleep(0.5)
+        link_or_copy(src, dst)
+
+    monkeypatch.setattr(cache_module, "link_or_copy", slow_link_or_copy)
+    (tmp_path / "a.part").write_bytes(b"a")
+    store = threading.Thread(target=cache.store, args=("u", str(tmp_path / "a.part"), str(tmp_path / "a"),
+                                                       "aa" * 32, 1, '"v1"'))
+    store.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    assert cache.lookup("other") == ({}, None)
+    assert time.monotonic() - start < 0.2
+    store.join()
+    assert cache.lookup("u") == ({"If-None-Match": '"v1"'}, "aa" * 32)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".link")]
+    cache.close()
@@ -0,0 +1,192 @@
+import asyncio
+import os
+
+import aiohttp
+import cv2
+import numpy as np
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.encoding import FrameWriter
+from fast_images_loader.frames import GRAB, READ, SEEK, FrameJob, extract_frames, plan_jobs
+from fast_images_loader.loader import FastVideosLoader, VideoLoader
+
+
+def write_video(path, frames=90, fps=30):
+    # Every frame is filled with its own index so extracted frames can be identified
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for index in range(frames):
+        writer.write(np.full((48, 64, 3), index, np.uint8))
+    writer.release()
+
+
+def frame_values(paths):
+    return [int(round(cv2.imread(path).mean())) for path in paths]
+
+
+@pytest.mark.parametrize("mode", [READ, GRAB, SEEK])
+def test_extract_modes_pick_the_same_frames(tmp_path, mode):
+    video_path = str(tmp_path / "video.avi")
+    write_video(video_path)
+
+    paths = extract_frames(FrameJob(video_path, str(tmp_path / mode), frame_rate=2, mode=mode))
+
+    assert [os.path.basename(path) for path in paths] == [f"frame_{i:06d}.jpg" for i in range(6)]
+    assert [abs(value - i * 15) <= 2 for i, value in enumerate(frame_values(paths))] == [True] * 6
+
+
+def test_segmented_parallel_extraction(tmp_path):
+    video_folder = tmp_path / "videos"
+    video_folder.mkdir()
+    write_video(str(video_folder / "video_0.avi"))
+    write_video(str(video_folder / "video_1.avi"), frames=45)
+
+    jobs = plan_jobs(str(video_folder / "video_0.avi"), "out", frame_rate=2, segment_seconds=1)
+    assert [(job.start_frame, job.end_frame) for job in jobs] == [(0, 30), (30, 60), (60, None)]
+
+    loader = FastVideosLoader(extract_mode=GRAB, extract_workers=2, segment_seconds=1)
+    paths = loader.extract_frames_from_videos(str(video_folder), str(tmp_path / "frames"), 2)
+
+    assert len(paths) == 6 + 3
+    assert sorted(os.listdir(tmp_path / "frames" / "video_0")) == [f"frame_{i:06d}.jpg" for i in range(6)]
+    assert [abs(value - i * 15) <= 2 for i, value in enumerate(frame_values(paths[:6]))] == [True] * 6
+
+
+@pytest.mark.asyncio
+async def test_pipelined_extraction_bounds_pending_videos(tmp_path, monkeypatch):
+    video_path = str(tmp_path / "source.avi")
+    write_video(video_path, frames=60)
+    with open(video_path, "rb") as f:
+        body = f.read()
+    data_folder = tmp_path / "data"
+    videos_on_disk = []
+
+    def counting_extract_frames(job):
+        videos_on_disk.append(len([name for name in os.listdir(data_folder) if name.endswith(".avi")]))
+        return extract_frames(job)
+
+    monkeypatch.setattr("fast_images_loader.frames.extract_frames", counting_extract_frames)
+
+    async def video(request):
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/{name}", video)
+    async with TestServer(app) as server:
+        pairs = [(str(server.make_url(f"/{i}.avi")), str(data_folder / f"video_{i}.avi")) for i in range(4)]
+        loader = FastVideosLoader(max_in_flight=4)
+        paths = await loader.load_pairs_and_extract_frames_async(pairs, str(data_folder), frame_rate=1,
+                                                                 delete_videos=True, max_pending=1)
+
+    assert len(paths) == 4 * 2
+    assert paths[0] == os.path.join(str(data_folder), "frames", "video_0", "frame_000000.jpg")
+    assert videos_on_disk == [1, 1, 1, 1]
+    assert not [name for name in os.listdir(data_folder) if name.endswith(".avi")]
+
+
+def test_iter_frame_batches_from_buffer(tmp_path):
+    video_path = str(tmp_path / "video.avi")
+    write_video(video_path)
+    with open(video_path, "rb") as f:
+        body = f.read()
+
+    batches = list(VideoLoader().iter_frame_batches(body, batch_size=4, frame_rate=2, size=(32, 24), color="gray"))
+
+    assert [batch.frames.shape for batch in batches] == [(4, 24, 32), (2, 24, 32)]
+    assert batches[0].frames.dtype == np.uint8
+    assert list(np.concatenate([batch.timestamps for batch in batches])) == [0.0, 0.5, 1.0, 1.5, 2.0, 2.5]
+    assert abs(int(batches[1].frames[1].mean()) - 75) <= 2
+
+
+@pytest.mark.asyncio
+async def test_aiter_url_frame_batches(tmp_path):
+    video_path = str(tmp_path / "video.avi")
+    write_video(video_path)
+    with open(video_path, "rb") as f:
+        body = f.read()
+
+    async def video(request):
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/video.avi", video)
+    async with TestServer(app) as server, aiohttp.ClientSession() as session:
+        batches = [batch async for batch in VideoLoader().aiter_url_frame_batches(
+            session, str(server.make_url("/video.avi")), batch_size=8, frame_rate=2, color="rgb")]
+
+    assert len(batches) == 1
+    assert batches[0].frames.shape == (6, 48, 64, 3)
+
+
+@pytest.mark.parametrize("image_format, quality", [("jpg", 50), ("png", 1), ("webp", 80), ("npy", None)])
+def test_frame_writer_formats(tmp_path, image_format, quality):
+    video_path = str(tmp_path / "video.avi")
+    write_video(video_path)
+    writer = FrameWriter(image_format, quality=None if image_format == "png" else quality,
+                         compression=quality if image_format == "png" else None, size=(32, 24), threads=2)
+
+    paths = extract_frames(FrameJob(video_path, str(tmp_path / "frames"), frame_rate=2, mode=GRAB, writer=writer))
+
+    assert [os.path.basename(path) for path in paths] == [f"frame_{i:06d}.{image_format}" for i in range(6)]
+    frame = np.load(paths[3]) if image_format == "npy" else cv2.imread(paths[3])
+    assert frame.shape == (24, 32, 3)
+    assert abs(int(round(frame.mean())) - 45) <= 2
+
+
+@pytest.mark.asyncio
+async def test_pipelined_extraction_raises_failures(tmp_path, monkeypatch):
+    video_path = str(tmp_path / "source.avi")
+    write_video(video_path, frames=30)
+    with open(video_path, "rb") as f:
+        body = f.read()
+    data_folder = tmp_path / "data"
+    extracted = []
+
+    def failing_extract_frames(job):
+        if "video_1" in job.video_path:
+            raise ValueError("corrupt video_1")
+        extracted.append(job.video_path)
+        return extract_frames(job)
+
+    monkeypatch.setattr("fast_images_loader.frames.extract_frames", failing_extract_frames)
+
+    async def video(request):
+        if request.path == "/2.avi":
+            # The failed extraction finishes while this download is still running
+            await asyncio.sleep(0.5)
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/{name}", video)
+    async with TestServer(app) as server:
+        pairs = [(str(server.make_url(f"/{i}.avi")), str(data_folder / f"video_{i}.avi")) for i in range(3)]
+        with pytest.raises(ValueError, match="corrupt video_1"):
+            await FastVideosLoader().load_pairs_and_extract_frames_async(pairs, str(data_folder))
+
+    assert len(extracted) == 2
+
+
+@pytest.mark.asyncio
+async def test_pipelined_rerun_skips_deleted_videos(tmp_path):
+    video_path = str(tmp_path / "source.avi")
+    write_video(video_path, frames=30)
+    with open(video_path, "rb") as f:
+        body = f.read()
+    data_folder = tmp_path / "data"
+    hits = []
+
+    async def video(request):
+        hits.append(request.path)
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/{name}", video)
+    async with TestServer(app) as server:
+        pairs = [(str(server.make_url(f"/{i}.avi")), str(data_folder / f"video_{i}.avi")) for i in range(2)]
+        loader = FastVideosLoader(manifest=True)
+        first = await loader.load_pairs_and_extract_frames_async(pairs, str(data_folder), delete_videos=True)
+        second = await loader.load_pairs_and_extract_frames_async(pairs, str(data_folder), delete_videos=True)
+
+    assert len(first) == 2
+    assert second == []
+    assert sorted(hits) == ["/0.avi", "/1.avi"]
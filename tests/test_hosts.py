@@ -0,0 +1,63 @@
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.hosts import ERROR, NEUTRAL, SUCCESS, THROTTLED, HostLimiter
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.retry import RetryPolicy
+
+
+def test_aimd_limit():
+    limiter = HostLimiter(initial_limit=4, min_limit=1, max_limit=6)
+    started = time.monotonic()
+    for _ in range(20):
+        limiter.record("a.com", SUCCESS, started)
+    assert limiter.limit("a.com") == 6
+
+    limiter.record("a.com", THROTTLED, started)
+    assert limiter.limit("a.com") == 3
+    # Requests started before the last decrease do not shrink the limit again
+    limiter.record("a.com", ERROR, started)
+    assert limiter.limit("a.com") == 3
+    limiter.record("a.com", ERROR, time.monotonic())
+    assert limiter.limit("a.com") == 1
+    limiter.record("a.com", NEUTRAL, time.monotonic())
+    assert limiter.limit("a.com") == 1
+    assert limiter.limit("b.com") == 4
+    assert limiter.stats()["a.com"]["throttled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_requests():
+    limiter = HostLimiter(adaptive=False, rate=20, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        await limiter.acquire("a.com")
+    assert time.monotonic() - start >= 0.15
+    assert limiter.limit("a.com") is None
+
+
+@pytest.mark.asyncio
+async def test_throttled_host_shrinks_concurrency(tmp_path):
+    hits = []
+
+    async def image(request):
+        hits.append(request.path)
+        if len(hits) <= 4:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        return web.Response(body=b"image")
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    limiter = HostLimiter(initial_limit=8, max_limit=8)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url(f"/{i}.jpg")) for i in range(20)]
+        paths = [str(tmp_path / f"{i}.jpg") for i in range(20)]
+        loader = FastImagesLoader(max_in_flight=16, host_limiter=limiter,
+                                  retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01))
+        results = await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+
+    assert results.summary()["ok"] == 20
+    stats = next(iter(loader.host_stats().values()))
+    assert stats["throttled"] == 4
+    assert stats["decreases"] >= 1
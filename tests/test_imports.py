@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+from benchmarks.import_time import HEAVY_MODULES, measure
+
+
+def test_photo_path_does_not_import_opencv():
+    _, modules = measure("import fast_images_loader")
+    assert "fast_images_loader.loader" not in modules
+
+    _, modules = measure("from fast_images_loader import FastImagesLoader, Metrics, PairSource, ShardWriter")
+    assert not [module for module in HEAVY_MODULES if module in modules]
+
+
+def test_photo_cli_does_not_import_opencv(tmp_path):
+    # Port 9 (discard) is closed, so the download fails right away
+    code = ("import sys\n"
+            "from fast_images_loader.loader import main\n"
+            f"sys.argv = ['fast_images_loader', 'http://127.0.0.1:9/a.jpg', {str(tmp_path)!r}, '--max_attempts', '1']\n"
+            "main()\n"
+            "assert 'cv2' not in sys.modules, 'cv2 imported'\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_lazy_exports():
+    import fast_images_loader
+
+    assert set(fast_images_loader.__all__) <= set(dir(fast_images_loader))
+    assert fast_images_loader.FrameWriter.__module__ == "fast_images_loader.encoding"
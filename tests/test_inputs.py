@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import sys
+import threading
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.inputs import PairSource, detect_format
+from fast_images_loader.loader import FastImagesLoader
+
+
+def test_pair_source_formats(tmp_path):
+    (tmp_path / "urls.txt").write_text("http://h/a.jpg\n\n# comment\nhttp://h/b.jpg\tsub/b.jpg\n")
+    (tmp_path / "urls.csv").write_text("url,path\nhttp://h/a.jpg,\nhttp://h/b.jpg,sub/b.jpg\n")
+    (tmp_path / "urls.jsonl").write_text(
+        json.dumps({"url": "http://h/a.jpg"}) + "\n" + json.dumps({"url": "http://h/b.jpg", "path": "sub/b.jpg"}) + "\n")
+    expected = [("http://h/a.jpg", os.path.join("out", "photo_0.jpg")),
+                ("http://h/b.jpg", os.path.join("out", "sub/b.jpg"))]
+
+    for name in ("urls.txt", "urls.csv", "urls.jsonl"):
+        source = PairSource(str(tmp_path / name), "out")
+        assert source.input_format == detect_format(name)
+        assert list(source) == expected
+        # Sources are re-iterable
+        assert list(source) == expected
+
+
+def test_first_url_of_stdin_is_replayed(monkeypatch):
+    stdin = io.TextIOWrapper(io.BytesIO(b"http://h/a.mp4\tphoto_0.jpg\nhttp://h/b.mp4\n"))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    source = PairSource("-", "out")
+
+    assert source.first_url() == "http://h/a.mp4"
+    source.media, source.extension = "video", ".mp4"
+    # An explicit path is kept as it is
+    assert list(source) == [("http://h/a.mp4", os.path.join("out", "photo_0.jpg")),
+                            ("http://h/b.mp4", os.path.join("out", "video_1.mp4"))]
+
+
+@pytest.mark.asyncio
+async def test_generator_and_async_generator_input(tmp_path):
+    async def image(request):
+        return web.Response(body=b"x" * 10)
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    async with TestServer(app) as server:
+        def pairs():
+            for i in range(20):
+                yield str(server.make_url(f"/{i}.jpg")), str(tmp_path / f"{i}.jpg")
+
+        async def async_pairs():
+            for url, path in pairs():
+                yield url, path.replace(".jpg", "_async.jpg")
+
+        async with FastImagesLoader(max_in_flight=4, keep_results=False) as loader:
+            results = await loader.load_pairs_to_folder_async(pairs(), str(tmp_path))
+            async_results = await loader.load_pairs_to_folder_async(async_pairs(), str(tmp_path))
+
+    assert results.summary()["ok"] == async_results.summary()["ok"] == 20
+    assert len(results.index) == 0
+    assert len(os.listdir(tmp_path)) == 40
+
+
+@pytest.mark.asyncio
+async def test_sync_input_is_read_off_the_event_loop(tmp_path):
+    async def image(request):
+        return web.Response(body=b"x")
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    threads = set()
+    async with TestServer(app) as server:
+        def pairs():
+            for i in range(5):
+                threads.add(threading.get_ident())
+                yield str(server.make_url(f"/{i}.jpg")), str(tmp_path / f"{i}.jpg")
+
+        results = await FastImagesLoader().load_pairs_to_folder_async(pairs(), str(tmp_path))
+
+    assert results.summary()["ok"] == 5
+    assert threading.get_ident() not in threads
@@ -119,4 +119,49 @@ def test_fast_videos_loader(monkeypatch, tmp_path):
     
     # Check that frames were extracted
     assert frame_paths is not None
-    assert len(frame_paths) == 3
\ No newline at end of file
+    assert len(frame_paths) == 3
+
+@pytest.mark.asyncio
+async def test_shared_session_is_reused(monkeypatch, tmp_path):
+    sessions = []
+
+    async def mock_request(self, session, photo_url, photo_path):
+        sessions.append(session)
+        return 1
+
+    monkeypatch.setattr("fast_images_loader.loader.PhotoLoader.request", mock_request)
+
+    async with FastImagesLoader() as loader:
+        await loader.load_photos_to_folder_async(["https://example.com/1.jpg"], [str(tmp_path / "1.jpg")], str(tmp_path))
+        await loader.load_photos_to_folder_async(["https://example.com/2.jpg"], [str(tmp_path / "2.jpg")], str(tmp_path))
+        assert sessions[0] is sessions[1]
+    assert sessions[0].closed
+
+
+@pytest.mark.asyncio
+async def test_photos_stream_to_disk_atomically(tmp_path):
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    async def image(request):
+        return web.Response(body=b"x" * 200_000)
+
+    async def broken(request):
+        response = web.StreamResponse(headers={"Content-Length": "200000"})
+        await response.prepare(request)
+        await response.write(b"x" * 1000)
+        request.transport.close()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/image.jpg", image)
+    app.router.add_get("/broken.jpg", broken)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/image.jpg")), str(server.make_url("/broken.jpg"))]
+        paths = [str(tmp_path / "ok.jpg"), str(tmp_path / "broken.jpg")]
+        loader = FastImagesLoader(chunk_size=4096, writer_threads=2)
+        await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+
+    assert os.path.getsize(paths[0]) == 200_000
+    assert not os.path.exists(paths[1])
+    assert not any(name.endswith(".part") for name in os.listdir(tmp_path))
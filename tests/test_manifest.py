@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import os
+import sys
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.manifest import DONE, FAILED, PARTIAL, JobManifest
+from fast_images_loader.shards import ShardReader, ShardWriter
+
+VIDEO = bytes(range(256)) * 4000
+
+
+@pytest.mark.asyncio
+async def test_rerun_skips_completed_items(tmp_path):
+    hits = []
+
+    async def image(request):
+        hits.append(request.path)
+        if request.path == "/missing.jpg":
+            return web.Response(status=404)
+        return web.Response(body=b"image", headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/a.jpg")), str(server.make_url("/missing.jpg"))]
+        paths = [str(tmp_path / "a.jpg"), str(tmp_path / "missing.jpg")]
+        loader = FastImagesLoader(manifest=True)
+        await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+        await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+
+    assert hits == ["/a.jpg", "/missing.jpg", "/missing.jpg"]
+    manifest = JobManifest.for_folder(str(tmp_path))
+    entry = manifest.get(urls[0], paths[0])
+    assert entry.status == DONE
+    assert entry.size == 5
+    assert entry.etag == '"v1"'
+    assert manifest.get(urls[1], paths[1]).status == FAILED
+    manifest.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_video_resumes_with_range(tmp_path):
+    ranges = []
+
+    async def video(request):
+        ranges.append(request.headers.get("Range"))
+        if request.headers.get("Range") and request.headers.get("If-Range") == '"v1"':
+            start = int(request.headers["Range"][len("bytes="):-1])
+            return web.Response(status=206, body=VIDEO[start:], headers={"ETag": '"v1"'})
+        response = web.StreamResponse(headers={"ETag": '"v1"', "Content-Length": str(len(VIDEO))})
+        await response.prepare(request)
+        await response.write(VIDEO[:300_000])
+        await asyncio.sleep(0.1)
+        request.transport.close()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/video.mp4", video)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/video.mp4"))]
+        paths = [str(tmp_path / "video.mp4")]
+        loader = FastImagesLoader(manifest=True, chunk_size=1024)
+        await loader.load_videos_to_folder_async(urls, paths, str(tmp_path))
+
+    assert ranges[0] is None
+    assert ranges[1].startswith("bytes=")
+    with open(paths[0], "rb") as f:
+        assert f.read() == VIDEO
+    assert not os.path.exists(paths[0] + ".part")
+    manifest = JobManifest.for_folder(str(tmp_path))
+    assert manifest.get(urls[0], paths[0]).checksum == hashlib.sha256(VIDEO).hexdigest()
+    manifest.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_video_resumes_with_range(tmp_path):
+    ranges = []
+    cancelled = asyncio.Event()
+
+    async def video(request):
+        ranges.append(request.headers.get("Range"))
+        if request.headers.get("Range") and request.headers.get("If-Range") == '"v1"':
+            start = int(request.headers["Range"][len("bytes="):-1])
+            return web.Response(status=206, body=VIDEO[start:], headers={"ETag": '"v1"'})
+        response = web.StreamResponse(headers={"ETag": '"v1"', "Content-Length": str(len(VIDEO))})
+        await response.prepare(request)
+        await response.write(VIDEO[:300_000])
+        await cancelled.wait()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/video.mp4", video)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/video.mp4"))]
+        paths = [str(tmp_path / "video.mp4")]
+        loader = FastImagesLoader(manifest=True, chunk_size=1024)
+        task = asyncio.ensure_future(loader.load_videos_to_folder_async(urls, paths, str(tmp_path)))
+        while not os.path.exists(paths[0] + ".part") or os.path.getsize(paths[0] + ".part") < 100_000:
+            await asyncio.sleep(0.01)
+        # The entry is committed before the body arrives, so a killed process could resume as well
+        observer = JobManifest.for_folder(str(tmp_path))
+        assert observer.get(urls[0], paths[0]).status == PARTIAL
+        observer.close()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        cancelled.set()
+        await loader.load_videos_to_folder_async(urls, paths, str(tmp_path))
+
+    assert ranges[0] is None
+    assert len(ranges) == 2 and ranges[1].startswith("bytes=")
+    with open(paths[0], "rb") as f:
+        assert f.read() == VIDEO
+
+
+@pytest.mark.asyncio
+async def test_rerun_with_sink_skips_completed_items(tmp_path):
+    hits = []
+
+    async def image(request):
+        hits.append(request.path)
+        return web.Response(body=b"image")
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/a.jpg"))]
+        paths = [str(tmp_path / "a.jpg")]
+        for _ in range(2):
+            with ShardWriter(str(tmp_path / "shards"), root=str(tmp_path)) as sink:
+                results = await FastImagesLoader(manifest=True, sink=sink).load_photos_to_folder_async(
+                    urls, paths, str(tmp_path))
+
+    assert hits == ["/a.jpg"]
+    assert results.summary()["skipped"] == 1
+    assert sorted(os.listdir(tmp_path / "shards")) == ["shard-000000.idx", "shard-000000.tar"]
+    assert list(ShardReader(str(tmp_path / "shards"))) == ["a.jpg"]
+
+
+KILLED_BEFORE_CLOSE = """
+import asyncio, os, sys
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.manifest import JobManifest
+from fast_images_loader.shards import ShardWriter
+
+base_url, folder = sys.argv[1:]
+urls = [f"{base_url}/{i}.jpg" for i in range(20)]
+paths = [os.path.join(folder, f"{i}.jpg") for i in range(20)]
+loader = FastImagesLoader(manifest=JobManifest.for_folder(folder, commit_every=1),
+                          sink=ShardWriter(os.path.join(folder, "shards"), root=folder))
+asyncio.run(loader.load_photos_to_folder_async(urls, paths, folder))
+# Killed before sink.close()
+os._exit(0)
+"""
+
+
+@pytest.mark.asyncio
+async def test_items_in_an_unclosed_sink_survive_a_kill(tmp_path):
+    hits = []
+
+    async def image(request):
+        hits.append(request.path)
+        return web.Response(body=request.path.encode())
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        process = await asyncio.create_subprocess_exec(sys.executable, "-c", KILLED_BEFORE_CLOSE, base_url,
+                                                       str(tmp_path), cwd=os.path.dirname(os.path.dirname(__file__)))
+        assert await process.wait() == 0
+        urls = [f"{base_url}/{i}.jpg" for i in range(20)]
+        paths = [str(tmp_path / f"{i}.jpg") for i in range(20)]
+        with ShardWriter(str(tmp_path / "shards"), root=str(tmp_path)) as sink:
+            results = await FastImagesLoader(manifest=True, sink=sink).load_photos_to_folder_async(
+                urls, paths, str(tmp_path))
+
+    assert len(hits) == 20
+    assert results.summary()["skipped"] == 20
+    reader = ShardReader(str(tmp_path / "shards"))
+    assert len(reader) == 20
+    assert reader.read("7.jpg") == b"/7.jpg"
@@ -0,0 +1,81 @@
+import asyncio
+import time
+import urllib.request
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.metrics import ITEM_DONE, LOOP_LAG, REQUEST_END, REQUEST_START, Metrics
+from fast_images_loader.retry import RetryPolicy
+
+
+@pytest.mark.asyncio
+async def test_hooks_and_counters(tmp_path):
+    calls = {"flaky": 0}
+
+    async def handler(request):
+        if request.path == "/flaky.jpg":
+            calls["flaky"] += 1
+            if calls["flaky"] == 1:
+                return web.Response(status=500)
+        if request.path == "/missing.jpg":
+            return web.Response(status=404)
+        return web.Response(body=b"x" * 1000, content_type="image/jpeg")
+
+    events = []
+    metrics = Metrics(hooks=[lambda event, fields: events.append((event, fields))])
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url(f"/{name}.jpg")) for name in ("ok", "flaky", "missing")]
+        paths = [str(tmp_path / f"{i}.jpg") for i in range(3)]
+        loader = FastImagesLoader(metrics=metrics, retry_policy=RetryPolicy(base_delay=0.01))
+        await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+        host = f"{server.host}:{server.port}"
+
+    names = [event for event, _ in events]
+    assert names.count(REQUEST_START) == names.count(REQUEST_END) == 4
+    assert names.count(ITEM_DONE) == 3
+    ends = [fields for event, fields in events if event == REQUEST_END]
+    assert sorted(fields["http_status"] for fields in ends) == [200, 200, 404, 500]
+
+    stats = metrics.snapshot()
+    assert stats["requests"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["retries"] == 1
+    assert stats["bytes"] == 2000
+    assert stats["items"]["ok"] == 2 and stats["items"]["failed"] == 1
+    assert stats["hosts"] == {host: {"requests": 4, "errors": 1, "throttled": 0}}
+
+    text = metrics.prometheus()
+    assert "fil_requests_total 4\n" in text
+    assert 'fil_items_total{status="failed"} 1\n' in text
+    assert f'fil_host_errors_total{{host="{host}"}} 1\n' in text
+
+
+def test_prometheus_server():
+    metrics = Metrics()
+    metrics.add_bytes(123)
+    port = metrics.start_server(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "fil_bytes_total 123\n" in response.read().decode()
+    finally:
+        metrics.close()
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_sampling():
+    lags = []
+    metrics = Metrics(hooks=[lambda event, fields: lags.append(fields["seconds"]) if event == LOOP_LAG else None],
+                      sample_loop_lag=True, lag_interval=0.01)
+    async with metrics.monitoring():
+        await asyncio.sleep(0.05)
+        # Block the loop like a synchronous call in a callback would
+        time.sleep(0.2)
+        await asyncio.sleep(0.05)
+
+    assert max(lags) >= 0.15
+    assert metrics.snapshot()["loop_lag_max"] == max(lags)
@@ -0,0 +1,62 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.processing import ImageProcessor, InvalidImage, sniff_image
+from fast_images_loader.results import FAILED, OK
+
+
+def encode(extension, width=400, height=300):
+    return cv2.imencode(extension, np.full((height, width, 3), 120, np.uint8))[1].tobytes()
+
+
+def test_process_rejects_and_resizes():
+    processor = ImageProcessor(max_side=100)
+    jpeg = encode(".jpg")
+
+    with pytest.raises(InvalidImage):
+        processor.process(b"<html>Not found</html>", "image/jpeg")
+    with pytest.raises(InvalidImage):
+        processor.process(jpeg, "text/html; charset=utf-8")
+    with pytest.raises(InvalidImage):
+        processor.process(jpeg[:len(jpeg) // 2], "image/jpeg")
+
+    resized = processor.process(jpeg, "image/jpeg")
+    assert sniff_image(resized) == ".jpg"
+    assert cv2.imdecode(np.frombuffer(resized, np.uint8), cv2.IMREAD_COLOR).shape == (75, 100, 3)
+
+    small = encode(".png", 50, 40)
+    assert processor.process(small, None) is small
+    webp = ImageProcessor(image_format="webp", quality=80).process(small, "application/octet-stream")
+    assert sniff_image(webp) == ".webp"
+
+
+@pytest.mark.asyncio
+async def test_invalid_bodies_never_reach_disk(tmp_path):
+    jpeg = encode(".jpg", 2000, 1000)
+
+    async def handler(request):
+        if request.path == "/error.jpg":
+            return web.Response(text="<html>Rate limited</html>", content_type="text/html")
+        return web.Response(body=jpeg, content_type="image/jpeg")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/big.jpg")), str(server.make_url("/error.jpg"))]
+        paths = [str(tmp_path / "big.jpg"), str(tmp_path / "error.jpg")]
+        loader = FastImagesLoader(image_processor=ImageProcessor(max_side=500, quality=85))
+        results = await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+
+    rows = {results.index[row]: results[row] for row in range(len(results))}
+    assert rows[0].status == OK
+    assert cv2.imread(paths[0]).shape == (250, 500, 3)
+    assert rows[0].bytes == os.path.getsize(paths[0])
+    assert rows[1].status == FAILED
+    assert rows[1].error == "InvalidImage"
+    assert rows[1].attempts == 1
+    assert sorted(os.listdir(tmp_path)) == ["big.jpg"]
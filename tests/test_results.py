@@ -0,0 +1,46 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.results import FAILED, OK, DownloadResults, ItemResult
+
+
+@pytest.mark.asyncio
+async def test_results_record_each_item(tmp_path):
+    async def image(request):
+        if request.path == "/missing.jpg":
+            return web.Response(status=404)
+        return web.Response(body=b"x" * 1234)
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/a.jpg")), str(server.make_url("/missing.jpg"))]
+        paths = [str(tmp_path / "a.jpg"), str(tmp_path / "missing.jpg")]
+        results = await FastImagesLoader().load_photos_to_folder_async(urls, paths, str(tmp_path))
+
+    assert len(results) == 2
+    rows = {results.index[row]: results[row] for row in range(len(results))}
+    assert rows[0].status == OK
+    assert rows[0].http_status == 200
+    assert rows[0].bytes == 1234
+    assert rows[0].attempts == 1
+    assert rows[0].total >= rows[0].ttfb > 0
+    assert rows[1].status == FAILED
+    assert rows[1].http_status == 404
+    assert rows[1].error == "HTTPError"
+    assert results.failed() == [(urls[1], paths[1])]
+    assert results.summary()["ok"] == 1
+
+
+def test_extend_translates_indices_and_errors():
+    first, second = DownloadResults(), DownloadResults()
+    first.append(0, "u0", "p0", ItemResult(FAILED, error="TimeoutError"))
+    second.append(0, "u1", "p1", ItemResult(FAILED, error="ClientConnectorError"))
+    second.append(1, "u3", "p3", ItemResult(FAILED, error="TimeoutError"))
+
+    first.extend(second, lambda index: 1 + index * 2)
+
+    assert list(first.index) == [0, 1, 3]
+    assert [first[row].error for row in range(3)] == ["TimeoutError", "ClientConnectorError", "TimeoutError"]
+    assert first.error_classes == ["TimeoutError", "ClientConnectorError"]
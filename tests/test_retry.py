@@ -0,0 +1,82 @@
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.results import FAILED, OK
+from fast_images_loader.retry import RetryPolicy, parse_retry_after
+
+
+@pytest.mark.asyncio
+async def test_transient_statuses_are_retried_and_fatal_are_not(tmp_path):
+    hits = {"/busy.jpg": 0, "/missing.jpg": 0}
+
+    async def image(request):
+        hits[request.path] += 1
+        if request.path == "/missing.jpg":
+            return web.Response(status=404)
+        if hits[request.path] < 3:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        return web.Response(body=b"image")
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    async with TestServer(app) as server:
+        urls = [str(server.make_url("/busy.jpg")), str(server.make_url("/missing.jpg"))]
+        paths = [str(tmp_path / "busy.jpg"), str(tmp_path / "missing.jpg")]
+        loader = FastImagesLoader(retry_policy=RetryPolicy(max_attempts=5, base_delay=0.01))
+        results = await loader.load_photos_to_folder_async(urls, paths, str(tmp_path))
+
+    rows = {results.index[row]: results[row] for row in range(len(results))}
+    assert hits == {"/busy.jpg": 3, "/missing.jpg": 1}
+    assert rows[0].status == OK and rows[0].attempts == 3
+    assert rows[1].status == FAILED and rows[1].attempts == 1
+
+
+def test_backoff_and_retry_after():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=False, max_retry_after=60)
+    assert [policy.delay(attempt) for attempt in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 5.0]
+    assert policy.delay(1, "7") == 7.0
+    assert policy.delay(1, "3600") == 60
+    assert 0 <= RetryPolicy(base_delay=1.0).delay(3) <= 4.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+
+
+def test_retry_budget():
+    policy = RetryPolicy(max_attempts=10, retry_budget=2)
+    assert policy.can_retry(1)
+    assert policy.can_retry(1)
+    assert not policy.can_retry(1)
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_pauses_host():
+    policy = RetryPolicy(breaker_threshold=2, breaker_cooldown=0.2)
+    policy.record_failure("a.com")
+    policy.record_failure("a.com")
+    start = time.monotonic()
+    await policy.wait_for_host("a.com")
+    assert time.monotonic() - start >= 0.15
+    start = time.monotonic()
+    await policy.wait_for_host("b.com")
+    assert time.monotonic() - start < 0.05
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    policy = RetryPolicy(breaker_threshold=1, breaker_cooldown=0.1)
+    policy.record_failure("a.com")
+    assert policy.host_delay("a.com") > 0.05
+    time.sleep(0.1)
+    assert policy.host_delay("a.com") == 0
+    policy.admit("a.com")
+    assert policy.host_delay("a.com") > 0
+    # A failed probe pauses the host for another cooldown
+    policy.record_failure("a.com")
+    assert policy.host_delay("a.com") > 0.05
+    time.sleep(0.1)
+    policy.admit("a.com")
+    policy.record_success("a.com")
+    assert policy.host_delay("a.com") == 0
+    policy.admit("a.com")
+    assert policy.host_delay("a.com") == 0
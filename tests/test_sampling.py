@@ -0,0 +1,42 @@
+import os
+
+import cv2
+import numpy as np
+from fast_images_loader.frames import FrameJob, extract_frames, iter_frames
+from fast_images_loader.sampling import FrameSampler, hamming, phash, scene_difference, thumbnail
+
+
+def scenes():
+    gradient = np.tile(np.linspace(0, 255, 64, dtype=np.uint8), (48, 1))
+    checker = (np.indices((48, 64)).sum(axis=0) // 8 % 2 * 255).astype(np.uint8)
+    return [np.dstack([image] * 3) for image in (gradient, gradient.T[:48, :48].repeat(2, axis=1)[:, :64], checker)]
+
+
+def write_scenes(path, frames_per_scene=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for scene in scenes():
+        for _ in range(frames_per_scene):
+            writer.write(scene)
+    writer.release()
+
+
+def test_metrics():
+    first, second, third = (thumbnail(scene) for scene in scenes())
+    assert scene_difference(first, first) == 0
+    assert scene_difference(first, third) > 0.1
+    assert hamming(phash(first), phash(first)) == 0
+    assert hamming(phash(first), phash(third)) > 10
+
+
+def test_samplers_drop_repeated_frames(tmp_path):
+    video_path = str(tmp_path / "video.avi")
+    write_scenes(video_path)
+
+    assert len(list(iter_frames(video_path, frame_rate=10))) == 30
+    for sampler in (FrameSampler(scene_threshold=0.05), FrameSampler(dedup_distance=4)):
+        timestamps = [timestamp for timestamp, _ in iter_frames(video_path, frame_rate=10, sampler=sampler)]
+        assert timestamps == [0.0, 1.0, 2.0]
+
+    paths = extract_frames(FrameJob(video_path, str(tmp_path / "frames"), frame_rate=10,
+                                    sampler=FrameSampler(scene_threshold=0.05, max_frames=2)))
+    assert [os.path.basename(path) for path in paths] == ["frame_000000.jpg", "frame_000010.jpg"]
@@ -0,0 +1,107 @@
+import asyncio
+import time
+import pytest
+from fast_images_loader.hosts import HostLimiter
+from fast_images_loader.retry import RetryPolicy
+from fast_images_loader.scheduler import SlidingWindowScheduler, url_host
+
+
+@pytest.mark.asyncio
+async def test_slow_item_does_not_stall_window():
+    finished = []
+
+    async def handler(url, path):
+        await asyncio.sleep(0.3 if url.endswith("slow") else 0.01)
+        finished.append(url)
+
+    items = [("https://a.com/slow", "p0")] + [(f"https://a.com/{i}", f"p{i}") for i in range(1, 20)]
+    await SlidingWindowScheduler(max_in_flight=2).run(items, handler)
+
+    # All fast items pass through the second slot while the slow one is still running
+    assert finished[-1] == "https://a.com/slow"
+    assert len(finished) == 20
+
+
+@pytest.mark.asyncio
+async def test_window_and_per_host_limits():
+    running = {"total": 0, "a.com": 0, "b.com": 0}
+    peaks = {"total": 0, "a.com": 0, "b.com": 0}
+
+    async def handler(url, path):
+        host = url_host(url)
+        for key in ("total", host):
+            running[key] += 1
+            peaks[key] = max(peaks[key], running[key])
+        await asyncio.sleep(0.01)
+        for key in ("total", host):
+            running[key] -= 1
+
+    items = [(f"https://a.com/{i}", "") for i in range(20)] + [(f"https://b.com/{i}", "") for i in range(20)]
+    await SlidingWindowScheduler(max_in_flight=6, per_host_limit=2).run(items, handler)
+
+    assert peaks["a.com"] == 2
+    assert peaks["b.com"] == 2
+    assert peaks["total"] <= 6
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_are_raised():
+    async def handler(url, path):
+        raise ValueError(url)
+
+    with pytest.raises(ValueError):
+        await SlidingWindowScheduler(max_in_flight=3).run([("https://a.com/x", "")], handler)
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_host_does_not_hold_the_window():
+    finished = {}
+    start = time.monotonic()
+
+    async def handler(url, path):
+        await asyncio.sleep(0.01)
+        finished[url] = time.monotonic() - start
+
+    items = [(f"https://a.com/{i}", "") for i in range(6)] + [("https://b.com/0", "")]
+    limiter = HostLimiter(adaptive=False, rate=5, burst=1)
+    await SlidingWindowScheduler(max_in_flight=2, host_limiter=limiter).run(items, handler)
+
+    # a.com items wait parked for their tokens instead of sleeping in both window slots
+    assert finished["https://b.com/0"] < 0.1
+    assert finished["https://a.com/5"] >= 0.9
+    assert len(finished) == 7
+
+
+@pytest.mark.asyncio
+async def test_paused_host_is_probed_once_after_cooldown():
+    policy = RetryPolicy(breaker_threshold=1, breaker_cooldown=0.3)
+    policy.record_failure("a.com")
+    spans = {}
+    start = time.monotonic()
+
+    async def handler(url, path):
+        started = time.monotonic() - start
+        await asyncio.sleep(0.05)
+        policy.record_success(url_host(url))
+        spans[url] = (started, time.monotonic() - start)
+
+    items = [(f"https://a.com/{i}", "") for i in range(4)] + [("https://b.com/0", "")]
+    await SlidingWindowScheduler(max_in_flight=2, retry_policy=policy).run(items, handler)
+
+    assert spans["https://b.com/0"][1] < 0.1
+    probe = spans["https://a.com/0"]
+    assert probe[0] >= 0.25
+    # The other items of the host wait for the probe to succeed
+    assert min(spans[f"https://a.com/{i}"][0] for i in range(1, 4)) >= probe[1]
+
+
+@pytest.mark.asyncio
+async def test_handler_error_with_full_parking_does_not_hang():
+    async def handler(url, path):
+        await asyncio.sleep(0.01)
+        raise ValueError(url)
+
+    items = [(f"https://a.com/{i}", "") for i in range(10)]
+    scheduler = SlidingWindowScheduler(max_in_flight=2, per_host_limit=1, max_parked=1)
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(scheduler.run(items, handler), 2)
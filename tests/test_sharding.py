@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fast_images_loader.loader import FastImagesLoader
+from fast_images_loader.shards import ShardReader, ShardWriter
+
+# Start time of every /slow request
+_slow_starts = []
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.path.startswith("/slow"):
+            _slow_starts.append((self.path, time.monotonic()))
+            time.sleep(0.3)
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    # Worker processes need a server that keeps answering while the parent blocks
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_sharded_photos(server_url, tmp_path):
+    urls = [f"{server_url}/image_{i}.jpg" for i in range(9)] + [f"{server_url}/missing.jpg"]
+    paths = [str(tmp_path / f"photo_{i}.jpg") for i in range(len(urls))]
+
+    results = FastImagesLoader(max_in_flight=4).load_photos_to_folder_sharded(urls, paths, str(tmp_path), workers=2)
+
+    assert results.failed() == [(urls[-1], paths[-1])]
+    assert sorted(results.index) == list(range(len(urls)))
+    for i in range(9):
+        with open(paths[i], "rb") as f:
+            assert f.read() == f"/image_{i}.jpg".encode()
+    assert not os.path.exists(paths[-1])
+
+
+def test_sharded_workers_share_the_manifest(server_url, tmp_path):
+    _slow_starts.clear()
+    urls = [f"{server_url}/slow_{i}.jpg" for i in range(32)]
+    paths = [str(tmp_path / f"photo_{i}.jpg") for i in range(len(urls))]
+    loader = FastImagesLoader(max_in_flight=4, manifest=True)
+
+    first = loader.load_photos_to_folder_sharded(urls, paths, str(tmp_path), workers=2)
+    second = loader.load_photos_to_folder_sharded(urls, paths, str(tmp_path), workers=2)
+
+    assert first.summary()["ok"] == 32
+    assert second.summary()["skipped"] == 32
+    # Each worker starts its second round of requests right after the first one; a worker blocked on
+    # the other one's open manifest transaction would only continue once the other one is done
+    for shard in range(2):
+        starts = sorted(start for path, start in _slow_starts
+                        if int(path[len("/slow_"):-len(".jpg")]) % 2 == shard)
+        assert starts[4] - starts[0] < 0.8
+
+
+def test_sharded_photos_into_shards(server_url, tmp_path):
+    urls = [f"{server_url}/image_{i}.jpg" for i in range(6)]
+    paths = [str(tmp_path / f"photo_{i}.jpg") for i in range(len(urls))]
+    sink = ShardWriter(str(tmp_path / "shards"), root=str(tmp_path))
+
+    FastImagesLoader(sink=sink).load_photos_to_folder_sharded(urls, paths, str(tmp_path), workers=2)
+
+    reader = ShardReader(str(tmp_path / "shards"))
+    assert sorted(reader) == [f"photo_{i}.jpg" for i in range(6)]
+    assert reader.read("photo_4.jpg") == b"/image_4.jpg"
+    assert sorted(os.listdir(tmp_path / "shards")) == ["shard-w000-000000.idx", "shard-w000-000000.tar",
+                                                       "shard-w001-000000.idx", "shard-w001-000000.tar"]
@@ -0,0 +1,117 @@
+import os
+import tarfile
+
+import cv2
+import numpy as np
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader.encoding import FrameWriter
+from fast_images_loader.loader import FastImagesLoader, FastVideosLoader, MediaLoader
+from fast_images_loader.shards import ShardReader, ShardWriter
+
+
+def test_shards_rotate_and_index(tmp_path):
+    folder = str(tmp_path / "shards")
+    with ShardWriter(folder, max_bytes=5000, root=str(tmp_path)) as sink:
+        for i in range(5):
+            sink.add(sink.member_name(str(tmp_path / "images" / f"{i}.jpg")), bytes([i]) * 1000)
+        source = tmp_path / "file.bin"
+        source.write_bytes(b"y" * 3000)
+        sink.add_file("file.bin", str(source), remove=True)
+
+    assert [os.path.basename(path) for path in sink.shard_paths] == [
+        "shard-000000.tar", "shard-000001.tar", "shard-000002.tar"]
+    assert not source.exists()
+    with tarfile.open(sink.shard_paths[0]) as tar:
+        assert tar.getnames() == ["images/0.jpg", "images/1.jpg", "images/2.jpg"]
+        assert tar.extractfile("images/1.jpg").read() == b"\x01" * 1000
+
+    reader = ShardReader(folder)
+    assert len(reader) == 6
+    assert reader.read("images/4.jpg") == b"\x04" * 1000
+    assert reader.read("file.bin") == b"y" * 3000
+
+    # A second run adds shards instead of overwriting
+    with ShardWriter(folder) as sink:
+        sink.add("more.jpg", b"z")
+    assert os.path.basename(sink.shard_paths[0]) == "shard-000003.tar"
+
+
+@pytest.mark.asyncio
+async def test_photos_into_shards(tmp_path):
+    async def image(request):
+        return web.Response(body=request.path.encode() * 100)
+
+    app = web.Application()
+    app.router.add_get("/{name}", image)
+    sink = ShardWriter(str(tmp_path / "shards"), root=str(tmp_path))
+    async with TestServer(app) as server:
+        pairs = [(str(server.make_url(f"/{i}.jpg")), str(tmp_path / "photos" / f"{i}.jpg")) for i in range(10)]
+        results = await FastImagesLoader(sink=sink).load_pairs_to_folder_async(pairs, str(tmp_path))
+    sink.close()
+
+    assert results.summary()["ok"] == 10
+    assert not os.path.exists(tmp_path / "photos")
+    reader = ShardReader(str(tmp_path / "shards"))
+    assert reader.read("photos/7.jpg") == b"/7.jpg" * 100
+
+
+@pytest.mark.asyncio
+async def test_large_and_unsized_bodies_stream_into_shards(tmp_path, monkeypatch):
+    body = bytes(range(256)) * 1000
+
+    async def video(request):
+        if request.path == "/streamed.mp4":
+            response = web.StreamResponse()
+            response.enable_chunked_encoding()
+            await response.prepare(request)
+            await response.write(body)
+            await response.write_eof()
+            return response
+        return web.Response(body=body)
+
+    async def no_buffering(self, res):
+        raise AssertionError("body buffered in memory")
+
+    monkeypatch.setattr(MediaLoader, "sink_in_memory_limit", 1000)
+    monkeypatch.setattr(MediaLoader, "_read_body", no_buffering)
+    app = web.Application()
+    app.router.add_get("/{name}", video)
+    with ShardWriter(str(tmp_path / "shards"), root=str(tmp_path)) as sink:
+        async with TestServer(app) as server:
+            pairs = [(str(server.make_url(f"/{name}.mp4")), str(tmp_path / f"{name}.mp4"))
+                     for name in ("sized", "streamed")]
+            results = await FastVideosLoader(sink=sink).load_pairs_to_folder_async(pairs, str(tmp_path), "video")
+
+    assert results.summary()["ok"] == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith((".mp4", ".part"))]
+    reader = ShardReader(str(tmp_path / "shards"))
+    assert reader.read("sized.mp4") == reader.read("streamed.mp4") == body
+
+
+def test_frames_into_shards(tmp_path):
+    video_folder = tmp_path / "videos"
+    video_folder.mkdir()
+    writer = cv2.VideoWriter(str(video_folder / "clip.avi"), cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for index in range(60):
+        writer.write(np.full((48, 64, 3), index, np.uint8))
+    writer.release()
+
+    with ShardWriter(str(tmp_path / "shards"), root=str(tmp_path)) as sink:
+        loader = FastVideosLoader(extract_workers=2, frame_writer=FrameWriter("png", sink=sink))
+        paths = loader.extract_frames_from_videos(str(video_folder), str(tmp_path / "frames"), 2)
+
+    assert not os.path.exists(tmp_path / "frames")
+    reader = ShardReader(str(tmp_path / "shards"))
+    assert sorted(reader) == [f"frames/clip/frame_{i:06d}.png" for i in range(4)]
+    frame = cv2.imdecode(np.frombuffer(reader.read("frames/clip/frame_000002.png"), np.uint8), cv2.IMREAD_COLOR)
+    assert abs(int(frame.mean()) - 30) <= 2
+    assert len(paths) == 4
+
+
+@pytest.mark.asyncio
+async def test_pipelined_extraction_rejects_a_video_sink(tmp_path):
+    with ShardWriter(str(tmp_path / "shards")) as sink:
+        with pytest.raises(ValueError):
+            await FastVideosLoader(sink=sink).load_pairs_and_extract_frames_async([], str(tmp_path))
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from collections import namedtuple
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fast_images_loader import throttle
+from fast_images_loader.loader import FastImagesLoader, FastVideosLoader
+from fast_images_loader.results import FAILED, OK
+from fast_images_loader.throttle import BandwidthLimiter, DiskWatermark
+
+BODY = b"x" * 200_000
+
+
+def make_app():
+    async def handler(request):
+        if request.path == "/streamed.mp4":
+            # Chunked transfer without Content-Length
+            response = web.StreamResponse()
+            response.enable_chunked_encoding()
+            await response.prepare(request)
+            for _ in range(4):
+                await response.write(BODY[:50_000])
+            await response.write_eof()
+            return response
+        return web.Response(body=BODY, content_type="video/mp4")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_shared_bandwidth_limit(tmp_path):
+    limiter = BandwidthLimiter(500_000, burst=50_000)
+    async with TestServer(make_app()) as server:
+        urls = [str(server.make_url(f"/{i}.mp4")) for i in range(2)]
+        paths = [str(tmp_path / f"{i}.mp4") for i in range(2)]
+        loader = FastVideosLoader(max_bandwidth=limiter, chunk_size=16 * 1024)
+        start = time.monotonic()
+        results = await loader.load_videos_to_folder_async(urls, paths, str(tmp_path))
+        elapsed = time.monotonic() - start
+
+    assert results.summary()["ok"] == 2
+    # 400 KB at 500 KB/s after a 50 KB burst
+    assert elapsed >= 0.6
+
+
+@pytest.mark.asyncio
+async def test_max_file_size(tmp_path):
+    async with TestServer(make_app()) as server:
+        urls = [str(server.make_url(name)) for name in ("/sized.mp4", "/streamed.mp4")]
+        paths = [str(tmp_path / "sized.mp4"), str(tmp_path / "streamed.mp4")]
+        loader = FastVideosLoader(max_file_size=100_000, manifest=True)
+        results = await loader.load_videos_to_folder_async(urls, paths, str(tmp_path))
+        large_enough = await FastVideosLoader(max_file_size=len(BODY)).load_videos_to_folder_async(
+            urls[:1], paths[:1], str(tmp_path))
+
+    rows = [results[row] for row in range(len(results))]
+    assert [row.status for row in rows] == [FAILED, FAILED]
+    assert [row.error for row in rows] == ["FileTooLarge", "FileTooLarge"]
+    assert [row.attempts for row in rows] == [1, 1]
+    assert not any(name.endswith(".part") for name in os.listdir(tmp_path))
+    assert large_enough[0].status == OK
+    assert os.path.getsize(paths[0]) == len(BODY)
+
+
+@pytest.mark.asyncio
+async def test_disk_watermark_pauses_until_space_recovers(tmp_path, monkeypatch):
+    Usage = namedtuple("Usage", "total used free")
+    free = iter([10, 10, 1000])
+
+    def disk_usage(folder):
+        return Usage(2000, 0, next(free))
+
+    monkeypatch.setattr(throttle.shutil, "disk_usage", disk_usage)
+    watermark = DiskWatermark(100, check_interval=0, poll_interval=0.01)
+
+    await asyncio.wait_for(watermark.wait(str(tmp_path / "new" / "file.jpg")), 1)
+
+    assert not watermark.paused
+    assert next(free, None) is None
+
+
+@pytest.mark.asyncio
+async def test_disk_watermark_in_loader(tmp_path):
+    async with TestServer(make_app()) as server:
+        loader = FastImagesLoader(min_free_disk=DiskWatermark(2 ** 62, poll_interval=0.05))
+        task = asyncio.ensure_future(loader.load_photos_to_folder_async(
+            [str(server.make_url("/a.jpg"))], [str(tmp_path / "a.jpg")], str(tmp_path)))
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        assert loader.min_free_disk.paused
+        loader.min_free_disk.min_free_bytes = 0
+        results = await asyncio.wait_for(task, 2)
+
+    assert results[0].status == OK
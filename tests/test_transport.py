@@ -0,0 +1,14 @@
+import pytest
+from fast_images_loader.transport import Transport
+
+
+@pytest.mark.asyncio
+async def test_session_uses_transport_settings():
+    transport = Transport(limit=20, limit_per_host=4, ttl_dns_cache=600,
+                          connect_timeout=2.0, read_timeout=7.0, total_timeout=60.0)
+    async with transport.create_session() as session:
+        assert session.connector.limit == 20
+        assert session.connector.limit_per_host == 4
+        assert session.timeout.connect == 2.0
+        assert session.timeout.sock_read == 7.0
+        assert session.timeout.total == 60.0